@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.core.cache import cache
+
+
+def incr_counter(key: str, delta: int = 1) -> int:
+    """
+    Счётчик в кэше без срока жизни: add + incr атомарны в Redis, между воркерами счёт не теряется.
+    Возвращает новое значение.
+    """
+    cache.add(key, 0, None)
+    try:
+        return int(cache.incr(key, delta))
+    except ValueError:  # ключ вытеснен между add и incr
+        cache.set(key, delta, None)
+        return delta
+
+
+def read_counters(prefix: str, names: Iterable[str]) -> dict[str, int]:
+    """Значения счётчиков prefix + name одним запросом; отсутствующие — 0."""
+    names = list(names)
+    values = cache.get_many([prefix + name for name in names])
+    return {name: int(values.get(prefix + name, 0)) for name in names}
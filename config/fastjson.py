@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Типы, которых orjson не знает (Decimal, ленивые строки, QuerySet, numpy…), кодируются как у DRF.
+# Вывод совпадает с JSONRenderer по содержимому, но не байт в байт: float orjson пишет кратчайшей
+# записью (1e16 вместо 1e+16). Целые за пределами 64 бит orjson не кодирует — тогда стандартный json
+_drf_default = JSONEncoder().default
+NON_ASCII_RE = re.compile(r"[^\x00-\x7f]+")
+
+
+@lru_cache(maxsize=1)
+def load_orjson() -> Any:
+    # orjson необязателен: без него (или при FAST_JSON=0) — стандартный json
+    if not settings.FAST_JSON:
+        return None
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+@lru_cache(maxsize=1)
+def _options() -> int:
+    orjson = load_orjson()
+    # Даты — через DRF (…Z вместо +00:00), нестроковые ключи словарей — строками, как в json
+    return int(orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+def dumps(obj: Any) -> bytes:
+    """Компактный JSON в UTF-8, как у DRF JSONRenderer."""
+    orjson = load_orjson()
+    if orjson is not None:
+        try:
+            return bytes(orjson.dumps(obj, default=_drf_default, option=_options()))
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    orjson = load_orjson()
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer через orjson; отступы (browsable API, ?indent) — по-прежнему стандартным json."""
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None,
+               renderer_context: Optional[Mapping[str, Any]] = None) -> bytes:
+        indent = self.get_indent(accepted_media_type or "", renderer_context or {})
+        orjson = load_orjson()
+        if data is None or indent is not None or orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = bytes(orjson.dumps(data, default=_drf_default, option=_options()))
+        except orjson.JSONEncodeError:  # например, int больше 64 бит
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как DRF: U+2028/U+2029 экранируются, чтобы ответ оставался валидным JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser через orjson для тел в UTF-8 (остальные кодировки — стандартным json)."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream: Any, media_type: Optional[str] = None,
+              parser_context: Optional[Mapping[str, Any]] = None) -> Any:
+        orjson = load_orjson()
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class SessionJSONSerializer:
+    """
+    SESSION_SERIALIZER: как django.core.signing.JSONSerializer, но через orjson — корзина пишется
+    в сессию на каждое изменение. Вывод, как у json, только ASCII (не-ASCII — экранами \\uXXXX):
+    signing.JSONSerializer читает сессию как latin-1, так что откат на него безопасен.
+    """
+
+    def dumps(self, obj: Any) -> bytes:
+        orjson = load_orjson()
+        if orjson is not None:
+            try:
+                data = bytes(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS))
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                if data.isascii():
+                    return data
+                # Не-ASCII встречается только внутри строк: экранируем его так же, как json
+                return NON_ASCII_RE.sub(lambda m: json.dumps(m.group())[1:-1], data.decode()).encode("ascii")
+        return json.dumps(obj, separators=(",", ":")).encode("latin-1")
+
+    def loads(self, data: bytes) -> Any:
+        # Сессии, записанные до экранирования, — UTF-8: orjson читает и их
+        return loads(data)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Any, Iterator, TypeVar
+
+from django.db.models import Model, QuerySet
+
+M = TypeVar("M", bound=Model)
+
+
+def iter_keyset(qs: QuerySet[M], chunk_size: int = 1000) -> Iterator[list[M]]:
+    """
+    Постраничный обход queryset по первичному ключу (keyset pagination).
+    При DISABLE_SERVER_SIDE_CURSORS=True .iterator() всё равно выкачивает весь результат
+    в драйвер, а здесь каждый запрос ограничен chunk_size строками.
+    """
+    qs = qs.order_by("pk")
+    last_pk: Any = None
+    while True:
+        page = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseBase
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Имя с хэшем содержимого (см. products.models.ContentHashedImageField): файл по такому URL не меняется
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{16}[._]")
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class FileRange:
+    """
+    Окно [start, start + length) открытого файла для ответа 206. fileno() отдаётся как есть:
+    wsgi.file_wrapper (gunicorn) шлёт через sendfile с текущей позиции ровно Content-Length байт,
+    без него Django читает окно через read().
+    """
+
+    def __init__(self, file: BinaryIO, start: int, length: int) -> None:
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    «bytes=a-b» -> (начало, конец включительно). None — заголовок не разобран (отдаём файл целиком),
+    (size, size) — диапазон вне файла (416). Несколько диапазонов не поддерживаются — тоже весь файл.
+    """
+    m = RANGE_RE.match(header.strip())
+    if not m or (not m[1] and not m[2]):
+        return None
+    if not m[1]:  # последние N байт
+        return max(0, size - int(m[2])), size - 1
+    start = int(m[1])
+    end = min(int(m[2]), size - 1) if m[2] else size - 1
+    if start >= size or start > end:
+        return size, size
+    return start, end
+
+
+def _cache_headers(response: HttpResponseBase, path: str, etag: str, mtime: float) -> HttpResponseBase:
+    conf: dict[str, Any] = settings.MEDIA_SERVE
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(mtime)
+    if HASHED_NAME_RE.search(os.path.basename(path)):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=conf["MAX_AGE"])
+    return response
+
+
+def serve_media(request: HttpRequest, path: str) -> HttpResponseBase:
+    """
+    Файлы MEDIA_ROOT. С фронтовым сервером (MEDIA_SERVE["BACKEND"]) передача отдаётся ему
+    заголовком X-Accel-Redirect / X-Sendfile, иначе — FileResponse с поддержкой Range и 304.
+    """
+    conf: dict[str, Any] = settings.MEDIA_SERVE
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = full_path.stat()
+    except OSError:
+        raise Http404
+    if not full_path.is_file():
+        raise Http404
+    content_type = mimetypes.guess_type(full_path.name)[0] or "application/octet-stream"
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+    if conf["BACKEND"] == "x-accel-redirect":
+        # Range и условные запросы nginx обрабатывает сам
+        offloaded = HttpResponse(content_type=content_type)
+        offloaded["X-Accel-Redirect"] = quote(conf["ACCEL_PREFIX"] + path)
+        return _cache_headers(offloaded, path, etag, stat.st_mtime)
+    if conf["BACKEND"] == "x-sendfile":
+        offloaded = HttpResponse(content_type=content_type)
+        offloaded["X-Sendfile"] = str(full_path)
+        return _cache_headers(offloaded, path, etag, stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:  # 304 / 412
+        return _cache_headers(not_modified, path, etag, stat.st_mtime)
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if "Range" in request.headers and (not if_range or if_range in (etag, http_date(stat.st_mtime))):
+        byte_range = parse_range(request.headers["Range"], stat.st_size)
+
+    response: HttpResponseBase
+    if byte_range is None:
+        response = FileResponse(full_path.open("rb"), content_type=content_type)
+    elif byte_range[0] >= stat.st_size:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(full_path.open("rb"), start, end - start + 1),
+                                status=206, content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    response["Accept-Ranges"] = "bytes"
+    return _cache_headers(response, path, etag, stat.st_mtime)
@@ -107,6 +107,16 @@ if db["ENGINE"].endswith("postgresql"):
     db["DISABLE_SERVER_SIDE_CURSORS"] = True
     db.setdefault("CONN_MAX_AGE", int(os.environ.get("CONN_MAX_AGE", "60")))
 
+# Кэш: общий Redis для всех воркеров, если задан REDIS_URL (нужен пакет redis), иначе — память процесса
+if redis_url := os.environ.get("REDIS_URL"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": redis_url}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Пользователь из сессии загружается вместе с профилем. ModelBackend остаётся в списке для сессий,
+# открытых до его появления: get_user берёт бэкенд из сессии и без него разлогинил бы всех
+AUTHENTICATION_BACKENDS = ["users.backends.ProfileModelBackend", "django.contrib.auth.backends.ModelBackend"]
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -131,17 +141,42 @@ STATICFILES_DIRS = [BASE_DIR / "static"] if (BASE_DIR / "static").exists() else
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Раздача медиа: "django" — FileResponse (sendfile через wsgi.file_wrapper, Range, 304);
+# "x-accel-redirect" — nginx из internal location ACCEL_PREFIX; "x-sendfile" — Apache/lighttpd.
+# MAX_AGE — для файлов без хэша содержимого в имени, с хэшем — год и immutable.
+MEDIA_SERVE = {
+    "BACKEND": os.environ.get("MEDIA_SERVE_BACKEND", "django"),
+    "ACCEL_PREFIX": os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/"),
+    "MAX_AGE": int(os.environ.get("MEDIA_MAX_AGE", "3600")),
+}
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "myshop@example.com")
 
+# JWT: в режиме token-user API авторизует запрос по claims access-токена без загрузки User из БД;
+# отозванные роли/деактивация проверяются по отметке в кэше. Отметка должна быть видна всем воркерам,
+# поэтому по умолчанию режим включён только с общим кэшем (REDIS_URL).
+JWT_TOKEN_USER_MODE = os.environ.get("JWT_TOKEN_USER_MODE", "1" if redis_url else "0") == "1"
+JWT_USER_CACHE_SIZE = int(os.environ.get("JWT_USER_CACHE_SIZE", "1024"))
+
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.ClaimsTokenRefreshSerializer",
+    "TOKEN_USER_CLASS": "users.authentication.ShopTokenUser",
+}
+
+# JSON API, GraphQL и сессий через orjson, если он установлен (config.fastjson); 0 — стандартный json
+FAST_JSON = os.environ.get("FAST_JSON", "1") == "1"
+SESSION_SERIALIZER = "config.fastjson.SessionJSONSerializer"
+
 # DRF
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.TokenUserAuthentication" if JWT_TOKEN_USER_MODE
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -152,10 +187,36 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "config.fastjson.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "config.fastjson.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 12,
+    "DEFAULT_THROTTLE_CLASSES": ("config.throttling.TokenBucketThrottle",),
 }
 
+# Троттлинг API ведром токенов: лимиты на scope (throttle_scope у view) отдельно для анонимов и пользователей.
+# "120/min" — всплеск до 120 запросов, дальше 2 запроса/сек. BACKEND: "cache" (общий при Redis) или "memory".
+API_THROTTLE = {
+    "BACKEND": os.environ.get("API_THROTTLE_BACKEND", "cache"),
+    "MAX_ENTRIES": int(os.environ.get("API_THROTTLE_MAX_ENTRIES", "100000")),
+    "RATES": {
+        "default": {"anon": "120/min", "user": "600/min"},
+        "catalog": {"anon": "60/min", "user": "300/min"},
+        "cart": {"anon": "30/min", "user": "120/min"},
+    },
+}
+
+# Готовая OpenAPI-схема (manage.py build_openapi_schema); без файла схема генерируется при первом запросе
+OPENAPI_SCHEMA_FILE = Path(os.environ.get("OPENAPI_SCHEMA_FILE", BASE_DIR / "openapi-schema.yaml"))
+OPENAPI_SCHEMA_MAX_AGE = int(os.environ.get("OPENAPI_SCHEMA_MAX_AGE", "3600"))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "MyShop API",
     "DESCRIPTION": "REST API документация интернет-магазина",
@@ -168,6 +229,64 @@ GRAPHENE = {
     "SCHEMA": "graphql_app.schema.schema",
 }
 
+# Просмотры товаров: сколько дней хранить сырые записи до свёртки в суточные агрегаты
+PRODUCT_VIEWS_RETENTION_DAYS = int(os.environ.get("PRODUCT_VIEWS_RETENTION_DAYS", "30"))
+# Дедупликация просмотров: повтор (товар, посетитель) в пределах WINDOW секунд не пишется в БД.
+# BACKEND: "cache" — через CACHES (общий при Redis), "memory" — LRU на MAX_ENTRIES ключей в процессе.
+PRODUCT_VIEW_DEDUP = {
+    "BACKEND": os.environ.get("PRODUCT_VIEW_DEDUP_BACKEND", "cache"),
+    "WINDOW": int(os.environ.get("PRODUCT_VIEW_DEDUP_WINDOW", "1800")),
+    "MAX_ENTRIES": int(os.environ.get("PRODUCT_VIEW_DEDUP_MAX_ENTRIES", "100000")),
+}
+
+# Доставленные и отменённые заказы, не менявшиеся N дней, archive_orders переносит в архивные таблицы
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get("ORDER_ARCHIVE_AFTER_DAYS", "180"))
+
+# Idempotency-Key при создании заказа: ответ хранится TTL секунд (purge_idempotency_keys удаляет старые);
+# запрос, не завершившийся за LOCK_TIMEOUT секунд, считается оборванным — ключ можно использовать снова
+IDEMPOTENCY_KEY = {
+    "TTL": int(os.environ.get("IDEMPOTENCY_KEY_TTL", str(60 * 60 * 24))),
+    "LOCK_TIMEOUT": int(os.environ.get("IDEMPOTENCY_KEY_LOCK_TIMEOUT", "60")),
+}
+
+# Допуск к оформлению заказа в пик: WORKER_LIMIT одновременных заказов на процесс, GLOBAL_LIMIT — на все
+# воркеры (слоты в кэше, 0 — без общего лимита). Остальные ждут в очереди до QUEUE_TIMEOUT секунд,
+# опрашивая её раз в POLL_INTERVAL секунд; слот упавшего воркера освобождается через SLOT_TIMEOUT секунд.
+# Слоты и номера очереди живут в кэше, поэтому по умолчанию допуск включён только с общим кэшем (REDIS_URL).
+CHECKOUT_ADMISSION = {
+    "ENABLED": os.environ.get("CHECKOUT_ADMISSION_ENABLED", "1" if redis_url else "0") == "1",
+    "WORKER_LIMIT": int(os.environ.get("CHECKOUT_ADMISSION_WORKER_LIMIT", "4")),
+    "GLOBAL_LIMIT": int(os.environ.get("CHECKOUT_ADMISSION_GLOBAL_LIMIT", "16")),
+    "SLOT_TIMEOUT": int(os.environ.get("CHECKOUT_ADMISSION_SLOT_TIMEOUT", "30")),
+    "QUEUE_TIMEOUT": int(os.environ.get("CHECKOUT_ADMISSION_QUEUE_TIMEOUT", "600")),
+    "POLL_INTERVAL": int(os.environ.get("CHECKOUT_ADMISSION_POLL_INTERVAL", "2")),
+}
+
+# Сколько строк StockShard получает товар при включении шардирования остатка (админка, распродажи)
+STOCK_SHARDS = int(os.environ.get("STOCK_SHARDS", "8"))
+
+# Анонимный посетитель (просмотры, рекомендации) узнаётся по подписанной cookie, без создания сессии
+VISITOR_COOKIE_NAME = os.environ.get("VISITOR_COOKIE_NAME", "visitor_id")
+VISITOR_COOKIE_AGE = 60 * 60 * 24 * 365
+
+# Фасеты каталога: границы корзин цены и время жизни кэша посчитанных фасетов (сек)
+CATALOG_FACET_PRICE_EDGES = [500, 1000, 5000, 10000, 50000]
+CATALOG_FACETS_CACHE_TIMEOUT = int(os.environ.get("CATALOG_FACETS_CACHE_TIMEOUT", "60"))
+
+# Подсказки поиска: индекс в памяти процесса целиком перестраивается не реже раза в N секунд
+SUGGEST_INDEX_MAX_AGE = int(os.environ.get("SUGGEST_INDEX_MAX_AGE", "600"))
+
+# Колоночный снимок каталога (нужен numpy): фильтры и сортировки списка товаров без SQL.
+# Снимок перестраивается после изменений товаров и не реже раза в MAX_AGE секунд.
+CATALOG_ENGINE = {
+    "ENABLED": os.environ.get("CATALOG_ENGINE_ENABLED", "1") == "1",
+    "MAX_AGE": int(os.environ.get("CATALOG_ENGINE_MAX_AGE", "300")),
+}
+
+# Кэш фрагментов шаблонов ({% cachefragment %}): ключ меняется вместе с updated_at объектов,
+# поэтому таймаут только ограничивает, сколько живут устаревшие версии
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get("FRAGMENT_CACHE_TIMEOUT", str(60 * 60 * 24)))
+
 CORS_ALLOW_ALL_ORIGINS = True
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 14  # 14 дней
 
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional, Protocol
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
+
+from config.counters import incr_counter, read_counters
+
+logger = logging.getLogger(__name__)
+
+REJECTED_PREFIX = "api_throttle:rejected:"
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600}
+
+# (токенов в ведре, время последнего пополнения)
+BucketState = tuple[float, float]
+
+
+def parse_rate(spec: str) -> tuple[float, float]:
+    """«120/min» -> (ёмкость 120, пополнение 2 токена/сек): всплеск до полной ёмкости, дальше — средняя скорость."""
+    count, _, period = spec.partition("/")
+    capacity = float(count)
+    return capacity, capacity / PERIODS[period]
+
+
+def _consume(state: Optional[BucketState], capacity: float, refill: float, now: float) -> tuple[BucketState, float]:
+    """Забирает токен. Возвращает новое состояние и сколько ждать (0 — запрос пропускается)."""
+    tokens, updated = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - updated) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / refill
+
+
+class BucketStore(Protocol):
+    def take(self, key: str, capacity: float, refill: float) -> float:
+        ...
+
+
+class MemoryBucketStore:
+    """Вёдра в памяти процесса (LRU): лимит действует на каждый воркер отдельно."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, BucketState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill: float) -> float:
+        with self._lock:
+            state, wait = _consume(self._data.get(key), capacity, refill, time.monotonic())
+            self._data[key] = state
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return wait
+
+
+class CacheBucketStore:
+    """
+    Вёдра в cache framework — общие для воркеров при Redis. get/set не атомарны:
+    при гонке пара параллельных запросов может пройти сверх лимита, это допустимо.
+    Если кэш недоступен, используется ведро в памяти процесса.
+    """
+
+    prefix = "api_throttle:bucket:"
+
+    def __init__(self, fallback: MemoryBucketStore) -> None:
+        self.fallback = fallback
+
+    def take(self, key: str, capacity: float, refill: float) -> float:
+        try:
+            state = cache.get(self.prefix + key)
+            state, wait = _consume(state, capacity, refill, time.time())
+            # Полное ведро хранить незачем: запись живёт, пока оно не наполнится
+            cache.set(self.prefix + key, state, int(capacity / refill) + 1)
+        except Exception:  # noqa: BLE001 — кэш (Redis) недоступен
+            logger.warning("Throttle cache unavailable, using in-process buckets", exc_info=True)
+            return self.fallback.take(key, capacity, refill)
+        return wait
+
+
+@lru_cache(maxsize=1)
+def get_store() -> BucketStore:
+    conf: dict[str, Any] = settings.API_THROTTLE
+    memory = MemoryBucketStore(conf["MAX_ENTRIES"])
+    if conf["BACKEND"] == "memory":
+        return memory
+    return CacheBucketStore(memory)
+
+
+@lru_cache(maxsize=None)
+def scope_rates(scope: str) -> dict[str, tuple[float, float]]:
+    conf: dict[str, Any] = settings.API_THROTTLE
+    rates: dict[str, dict[str, str]] = conf["RATES"]
+    return {kind: parse_rate(spec) for kind, spec in rates.get(scope, rates["default"]).items()}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Троттлинг API по ведру токенов на (scope, клиент). scope берётся из атрибута view
+    `throttle_scope` (иначе "default"), клиент — id пользователя или IP для анонимов;
+    у анонимов и пользователей отдельные лимиты (API_THROTTLE["RATES"]).
+    """
+
+    def __init__(self) -> None:
+        self._wait: Optional[float] = None
+
+    def allow_request(self, request: Request, view: Any) -> bool:
+        scope = getattr(view, "throttle_scope", None) or "default"
+        if request.user and request.user.is_authenticated:
+            kind, ident = "user", f"u{request.user.pk}"
+        else:
+            kind, ident = "anon", self.get_ident(request)
+        capacity, refill = scope_rates(scope)[kind]
+        wait = get_store().take(f"{scope}:{ident}", capacity, refill)
+        if not wait:
+            return True
+        self._wait = wait
+        incr_counter(f"{REJECTED_PREFIX}{scope}:{kind}")
+        return False
+
+    def wait(self) -> Optional[float]:
+        return self._wait
+
+
+def rejected_stats() -> dict[str, int]:
+    """Отклонённые запросы по «scope:anon|user» с момента старта кэша."""
+    conf: dict[str, Any] = settings.API_THROTTLE
+    return read_counters(REJECTED_PREFIX, (f"{scope}:{kind}" for scope in conf["RATES"] for kind in ("anon", "user")))
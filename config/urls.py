@@ -1,8 +1,9 @@
+import re
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from django.urls import path, include, re_path
+from config.media import serve_media
+from config.views import LazyView, openapi_schema
 from products.views import HomeView
 
 urlpatterns = [
@@ -15,12 +16,16 @@ urlpatterns = [
                   path("", include(("users.urls", "users"), namespace="users")),
 
                   # REST API
-                  path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-                  path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+                  path("api/schema/", openapi_schema, name="schema"),
+                  path("api/docs/", LazyView("drf_spectacular.views.SpectacularSwaggerView", url_name="schema"),
+                       name="swagger-ui"),
                   path("api/", include("products.urls", namespace="api-products")),
                   path("api/", include("orders.urls", namespace="api-orders")),
                   path("api/", include("users.urls", namespace="api-users")),
 
                   # GraphQL
                   path("", include("graphql_app.urls")),
-              ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+                  # Медиа
+                  re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.+)$", serve_media, name="media"),
+              ]
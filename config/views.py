@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+
+YAML_CONTENT_TYPE = "application/vnd.oai.openapi"
+JSON_CONTENT_TYPE = "application/vnd.oai.openapi+json"
+
+
+class LazyView:
+    """
+    View, класс которой импортируется при первом запросе, а не при загрузке URLconf:
+    тяжёлые библиотеки (drf-spectacular, graphene_django.views) не замедляют старт воркера.
+    """
+
+    def __init__(self, dotted_path: str, csrf_exempt: bool = False, **initkwargs: Any) -> None:
+        self.dotted_path = dotted_path
+        self.initkwargs = initkwargs
+        # CsrfViewMiddleware смотрит на атрибут до вызова view, поэтому он задаётся заранее
+        self.csrf_exempt = csrf_exempt
+        self._view: Optional[Callable[..., HttpResponse]] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        if self._view is None:
+            with self._lock:
+                if self._view is None:
+                    self._view = import_string(self.dotted_path).as_view(**self.initkwargs)
+        return self._view(request, *args, **kwargs)
+
+
+# (тело, content-type, etag)
+SchemaDocument = tuple[bytes, str, str]
+
+_schema_document: Optional[SchemaDocument] = None
+_schema_lock = threading.Lock()
+
+
+def _document(body: bytes, content_type: str) -> SchemaDocument:
+    return body, content_type, '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def build_schema_document() -> SchemaDocument:
+    """Генерирует схему drf-spectacular (интроспекция всех viewset'ов) — дорого, вызывается один раз."""
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import OpenApiYamlRenderer
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return _document(OpenApiYamlRenderer().render(schema, renderer_context={}), YAML_CONTENT_TYPE)
+
+
+def get_schema_document() -> SchemaDocument:
+    """Схема из файла OPENAPI_SCHEMA_FILE (собирается build_openapi_schema), иначе — генерация с мемоизацией."""
+    global _schema_document
+    if _schema_document is None:
+        with _schema_lock:
+            if _schema_document is None:
+                path = Path(settings.OPENAPI_SCHEMA_FILE)
+                if path.is_file():
+                    content_type = JSON_CONTENT_TYPE if path.suffix == ".json" else YAML_CONTENT_TYPE
+                    _schema_document = _document(path.read_bytes(), content_type)
+                else:
+                    _schema_document = build_schema_document()
+    return _schema_document
+
+
+def openapi_schema(request: HttpRequest) -> HttpResponse:
+    body, content_type, etag = get_schema_document()
+    if etag in request.headers.get("If-None-Match", ""):
+        response: HttpResponse = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type=content_type)
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
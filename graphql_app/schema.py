@@ -2,8 +2,8 @@ from __future__ import annotations
 from typing import Any
 import graphene
 from graphene_django import DjangoObjectType
-from django.db.models import Sum
-from orders.models import Order
+from django.db.models import Count, Sum
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
 from products.models import Product
 
 
@@ -30,11 +30,22 @@ class Query(graphene.ObjectType):
     analytics = graphene.Field(AnalyticsType)
 
     def resolve_analytics(self, info: Any) -> AnalyticsType:
-        qs = Order.objects.filter(status__in=["paid", "shipped", "delivered"])
-        total = qs.aggregate(s=Sum("total_price"))["s"] or 0
-        cnt = qs.count()
+        # Вместе с архивными заказами (archive_orders)
+        statuses = ["paid", "shipped", "delivered"]
+        total = cnt = 0
+        for qs in (Order.objects.filter(status__in=statuses), ArchivedOrder.objects.filter(status__in=statuses)):
+            agg = qs.aggregate(s=Sum("total_price"), c=Count("id"))
+            total += agg["s"] or 0
+            cnt += agg["c"]
         avg = float(total) / cnt if cnt else 0.0
-        top = Product.objects.annotate(sold=Sum("orderitem__quantity")).order_by("-sold")[:5]
+        sold: dict[int, int] = {}
+        for item_model in (OrderItem, ArchivedOrderItem):
+            rows = item_model.objects.filter(product__isnull=False).values("product_id").annotate(q=Sum("quantity"))
+            for product_id, qty in rows.order_by().values_list("product_id", "q"):
+                sold[product_id] = sold.get(product_id, 0) + qty
+        top_ids = sorted(sold, key=sold.__getitem__, reverse=True)[:5]
+        products = Product.objects.in_bulk(top_ids)
+        top = [products[pk] for pk in top_ids if pk in products]
         return AnalyticsType(
             total_revenue=float(total),
             orders_count=cnt,
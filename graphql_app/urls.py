@@ -1,6 +1,6 @@
 from django.urls import path
-from graphene_django.views import GraphQLView
+from config.views import LazyView
 
 urlpatterns = [
-    path("graphql/", GraphQLView.as_view(graphiql=True)),
+    path("graphql/", LazyView("graphql_app.views.FastGraphQLView", graphiql=True)),
 ]
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.http import HttpRequest
+from graphene_django.views import GraphQLView
+
+from config.fastjson import dumps, load_orjson
+
+
+class FastGraphQLView(GraphQLView):
+    """GraphQLView, кодирующий ответы через config.fastjson (orjson, если установлен)."""
+
+    def json_encode(self, request: HttpRequest, d: Any, pretty: bool = False) -> str:
+        if load_orjson() is None or self.pretty or pretty or request.GET.get("pretty"):
+            return str(super().json_encode(request, d, pretty))
+        # Строка, а не bytes: пакетный режим склеивает ответы строками
+        return dumps(d).decode()
@@ -1,19 +1,31 @@
 from __future__ import annotations
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
 from django.contrib import admin
-from django.db.models import Sum, F, Count, QuerySet
+from django.db.models import Sum, F, Count, Max, QuerySet
 from django.db.models.functions import TruncDate
 from django.urls import path
 from django.template.response import TemplateResponse
 from django.contrib.auth.models import User
-from django.http import HttpRequest
-from .models import Order, OrderItem
-from products.models import Product, ProductView
+from django.http import HttpRequest, StreamingHttpResponse
+from django.utils import timezone
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .services.admission import admission_stats
+from .services.export import csv_streaming_response, iter_analytics_rows, iter_order_rows
+from .services.history import invalidate_order_summary
+from .services.purchases import refresh_purchases_for_orders
+from config import throttling
+from products.models import Product
+from products.paginators import EstimatedCountPaginator
+from products.services import view_dedup, view_retention
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
     readonly_fields = ("price",)
+    autocomplete_fields = ("product",)
 
 
 @admin.register(Order)
@@ -21,70 +33,118 @@ class OrderAdmin(admin.ModelAdmin):
     change_list_template = "admin/orders/order/change_list.html"
     list_display = ("id", "user", "status", "total_price", "created_at")
     list_filter = ("status", "created_at")
+    list_select_related = ("user",)
     search_fields = ("user__username", "id")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [OrderItemInline]
+    actions = ["mark_shipped", "mark_cancelled", "export_csv"]
 
     def get_urls(self) -> list:
         urls = super().get_urls()
         my = [
             path("analytics/", self.admin_site.admin_view(self.analytics_view),
                  name="orders_order_analytics"),
+            path("analytics/export/", self.admin_site.admin_view(self.analytics_export_view),
+                 name="orders_order_analytics_export"),
+            path("export/", self.admin_site.admin_view(self.export_view),
+                 name="orders_order_export"),
         ]
         return my + urls
 
-    def analytics_view(self, request: HttpRequest) -> TemplateResponse:
+    def _check_view_perm(self, request: HttpRequest) -> None:
         if not request.user.has_perm("orders.view_order"):
             from django.core.exceptions import PermissionDenied
             raise PermissionDenied
 
+    def analytics_view(self, request: HttpRequest) -> TemplateResponse:
+        self._check_view_perm(request)
+        context = dict(
+            self.admin_site.each_context(request),
+            title="Аналитика магазина",
+            **self.get_analytics_data(),
+        )
+        return TemplateResponse(request, "admin/orders/analytics.html", context)
+
+    def analytics_export_view(self, request: HttpRequest) -> StreamingHttpResponse:
+        self._check_view_perm(request)
+        filename = f"analytics-{timezone.localdate():%Y%m%d}.csv"
+        return csv_streaming_response(iter_analytics_rows(self.get_analytics_data()), filename)
+
+    def export_view(self, request: HttpRequest) -> StreamingHttpResponse:
+        # Выгружаем с учётом текущих фильтров/поиска changelist
+        self._check_view_perm(request)
+        qs = self.get_changelist_instance(request).get_queryset(request)
+        return csv_streaming_response(iter_order_rows(qs), f"orders-{timezone.localdate():%Y%m%d}.csv")
+
+    def get_analytics_data(self) -> dict[str, Any]:
         revenue_statuses = ["paid", "shipped", "delivered"]
-        orders = Order.objects.all()
+        # Статистика — по рабочим и архивным заказам (archive_orders)
+        sources = (Order.objects.all(), ArchivedOrder.objects.all())
 
-        revenue = orders.filter(status__in=revenue_statuses).aggregate(total=Sum("total_price"))["total"] or 0
-        orders_count = orders.count()
+        revenue = sum(
+            (qs.filter(status__in=revenue_statuses).aggregate(total=Sum("total_price"))["total"] or 0
+             for qs in sources),
+            Decimal("0.00"),
+        )
+        orders_count = sum(qs.count() for qs in sources)
 
         # Кол-во заказов по статусам
-        by_status = list(orders.values("status").annotate(c=Count("id")).order_by())
+        status_counts: dict[str, int] = {}
+        for qs in sources:
+            for row in qs.values("status").annotate(c=Count("id")).order_by():
+                status_counts[row["status"]] = status_counts.get(row["status"], 0) + row["c"]
+        by_status = [{"status": status, "c": c} for status, c in status_counts.items()]
 
         # Топ продаж
-        top_sold = list(
-            OrderItem.objects.values("product__id", "product__name")
-            .annotate(qty=Sum("quantity"), sum=Sum(F("price") * F("quantity")))
-            .order_by("-qty")[:10]
-        )
-
-        # Просмотры
-        total_views = ProductView.objects.count()
+        sold: dict[Any, dict[str, Any]] = {}
+        for item_model, name_field in ((OrderItem, "product__name"), (ArchivedOrderItem, "product_name")):
+            rows = (
+                item_model.objects.values("product_id")
+                .annotate(name=Max(name_field), qty=Sum("quantity"), sum=Sum(F("price") * F("quantity")))
+                .order_by()
+            )
+            for row in rows:
+                key = row["product_id"] or row["name"]  # товар архивного заказа мог быть удалён
+                entry = sold.setdefault(key, {"product__id": row["product_id"], "product__name": row["name"],
+                                              "qty": 0, "sum": 0})
+                entry["qty"] += row["qty"]
+                entry["sum"] += row["sum"]
+        top_sold = sorted(sold.values(), key=lambda entry: entry["qty"], reverse=True)[:10]
+
+        # Просмотры (с учётом свёрнутых в суточные агрегаты)
+        total_views = view_retention.total_views()
         top_viewed = list(
             Product.objects.order_by("-view_count").values("id", "name", "view_count")[:10]
         )
 
         # Динамика по дням (последние 14)
-        from django.utils import timezone
-        from datetime import timedelta
         since = timezone.now() - timedelta(days=14)
-        daily = list(
-            orders.filter(created_at__gte=since)
-            .annotate(day=TruncDate("created_at"))
-            .values("day")
-            .annotate(c=Count("id"), sum=Sum("total_price"))
-            .order_by("day")
-        )
-
-        cm_group_name = "Content Managers"
+        days: dict[Any, dict[str, Any]] = {}
+        for qs in sources:
+            day_rows = (
+                qs.filter(created_at__gte=since)
+                .annotate(day=TruncDate("created_at"))
+                .values("day")
+                .annotate(c=Count("id"), sum=Sum("total_price"))
+                .order_by()
+            )
+            for row in day_rows:
+                entry = days.setdefault(row["day"], {"day": row["day"], "c": 0, "sum": 0})
+                entry["c"] += row["c"]
+                entry["sum"] += row["sum"]
+        daily = sorted(days.values(), key=lambda entry: entry["day"])
+
+        cm_group_name = view_retention.CM_GROUP
         admins = User.objects.filter(is_superuser=True).count()
         cms = User.objects.filter(groups__name=cm_group_name).distinct().count()
         registered = User.objects.count()
         regular = max(registered - admins - cms, 0)
 
-        anon_views = ProductView.objects.filter(user__isnull=True).count()
-        cm_views = ProductView.objects.filter(user__groups__name=cm_group_name).count()
-        admin_views = ProductView.objects.filter(user__is_superuser=True).count()
-        user_views = total_views - anon_views - cm_views - admin_views
+        dedup = view_dedup.dedup_stats()
+        throttled = throttling.rejected_stats()
 
-        context = dict(
-            self.admin_site.each_context(request),
-            title="Аналитика магазина",
+        return dict(
             revenue=revenue,
             orders_count=orders_count,
             by_status=by_status,
@@ -94,15 +154,56 @@ class OrderAdmin(admin.ModelAdmin):
             daily=daily,
             user_split=dict(
                 registered=registered, admins=admins, cms=cms, regular=regular,
-                views=dict(anon=anon_views, admins=admin_views, cms=cm_views, users=user_views),
+                views=view_retention.views_by_role(),
             ),
+            view_dedup=dedup,
+            api_throttled=throttled,
+            checkout_admission=admission_stats(),
         )
-        return TemplateResponse(request, "admin/orders/analytics.html", context)
 
     @admin.action(description="Отметить как отправлено (для оплаченных)")
     def mark_shipped(self, request: HttpRequest, queryset: QuerySet[Order]) -> None:
-        queryset.filter(status="paid").update(status="shipped")
+        paid = queryset.filter(status="paid")
+        user_ids = list(paid.values_list("user_id", flat=True))
+        paid.update(status="shipped", updated_at=timezone.now())
+        invalidate_order_summary(*user_ids)
 
     @admin.action(description="Отменить (кроме отправленных/доставленных)")
     def mark_cancelled(self, request: HttpRequest, queryset: QuerySet[Order]) -> None:
-        queryset.exclude(status__in=["shipped", "delivered"]).update(status="cancelled")
+        cancellable = queryset.exclude(status__in=["shipped", "delivered"])
+        rows = list(cancellable.values_list("pk", "user_id"))
+        cancellable.update(status="cancelled", updated_at=timezone.now())
+        # update() не шлёт сигналов — индекс покупок и итоги пользователей обновляем явно
+        refresh_purchases_for_orders([pk for pk, _ in rows])
+        invalidate_order_summary(*(user_id for _, user_id in rows))
+
+    @admin.action(description="Выгрузить в CSV (с позициями)")
+    def export_csv(self, request: HttpRequest, queryset: QuerySet[Order]) -> StreamingHttpResponse:
+        return csv_streaming_response(iter_order_rows(queryset), f"orders-{timezone.localdate():%Y%m%d}.csv")
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    fields = ("product", "product_name", "quantity", "price")
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Архив только для просмотра: заказы попадают сюда командой archive_orders."""
+
+    list_display = ("id", "user", "status", "total_price", "created_at", "archived_at")
+    list_filter = ("status", "created_at")
+    list_select_related = ("user",)
+    search_fields = ("user__username", "id")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: Any = None) -> bool:
+        return False
@@ -7,4 +7,5 @@ class OrdersConfig(AppConfig):
     verbose_name = "Заказы"
 
     def ready(self) -> None:
+        from . import signals  # noqa: F401
         return None
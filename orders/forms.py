@@ -6,3 +6,5 @@ class CheckoutForm(forms.Form):
     shipping_address = forms.CharField(widget=forms.Textarea(attrs={"class": "form-control", "rows": 3}))
     payment_method = forms.ChoiceField(choices=[("mock", "Оплата при получении")],
                                        widget=forms.Select(attrs={"class": "form-select"}))
+    # Idempotency-Key для веб-формы: выдаётся при показе формы, одна отправка — один заказ
+    idempotency_key = forms.CharField(max_length=64, widget=forms.HiddenInput)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+from typing import Any
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from orders.services.archive import ArchiveStats, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Перенести доставленные и отменённые заказы старше N дней в архивные таблицы пачками"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--days", type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help="Сколько дней завершённый заказ остаётся в рабочих таблицах")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="Ограничить число пачек за запуск")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        def progress(stats: ArchiveStats) -> None:
+            self.stdout.write(f"пачка {stats.batches}: заказов {stats.orders}, позиций {stats.items}")
+
+        stats = archive_orders(
+            options["days"], batch_size=options["batch_size"],
+            max_batches=options["max_batches"], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"В архив перенесено заказов до {stats.cutoff:%Y-%m-%d}: {stats.orders} за {stats.elapsed:.1f} с"
+        ))
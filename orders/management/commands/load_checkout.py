@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import statistics
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.cookiejar import CookieJar
+from typing import Any, Optional
+from urllib.error import HTTPError
+from urllib.request import HTTPCookieProcessor, OpenerDirector, Request, build_opener
+
+from django.core.management.base import BaseCommand, CommandParser
+
+# (итоговый статус, сколько раз вставал в очередь, ожидание в очереди, полное время заказа) — секунды
+OrderResult = tuple[int, int, float, float]
+
+
+def _call(opener: OpenerDirector, url: str, data: Optional[dict[str, Any]] = None,
+          headers: Optional[dict[str, str]] = None) -> tuple[int, dict[str, str], Any]:
+    body = json.dumps(data).encode() if data is not None else None
+    request = Request(url, data=body, headers={"Content-Type": "application/json", **(headers or {})})
+    try:
+        with opener.open(request, timeout=60) as response:
+            return response.status, dict(response.headers), json.loads(response.read() or b"null")
+    except HTTPError as exc:
+        return exc.code, dict(exc.headers), json.loads(exc.read() or b"null")
+
+
+def _place_orders(base_url: str, username: str, password: str, product_id: int, orders: int) -> list[OrderResult]:
+    """Один процесс-«покупатель»: своя сессия (корзина), заказы подряд; очередь ожидает так же, как клиент API."""
+    opener = build_opener(HTTPCookieProcessor(CookieJar()))
+    _, _, tokens = _call(opener, f"{base_url}/api/users/login/", {"username": username, "password": password})
+    auth = {"Authorization": f"Bearer {tokens['access']}"}
+    results: list[OrderResult] = []
+    for _ in range(orders):
+        started = time.perf_counter()
+        status, headers, _ = _call(opener, f"{base_url}/api/cart/", {"product_id": product_id, "quantity": 1}, auth)
+        if status != 201:
+            results.append((status, 0, 0.0, time.perf_counter() - started))
+            continue
+        order_headers = {**auth, "Idempotency-Key": uuid.uuid4().hex}
+        queued, waited = 0, 0.0
+        while True:
+            status, headers, body = _call(opener, f"{base_url}/api/orders/", {"shipping_address": "Нагрузочный тест"},
+                                          order_headers)
+            if status == 429:  # троттлинг API — ждём и повторяем тот же заказ
+                time.sleep(float(headers.get("Retry-After", 1)))
+                continue
+            if status != 503 or not isinstance(body, dict) or "ticket" not in body:
+                break
+            queued += 1
+            wait_started = time.perf_counter()
+            order_headers["Checkout-Ticket"] = body["ticket"]
+            while True:
+                time.sleep(float(headers.get("Retry-After", 1)))
+                poll_status, headers, state = _call(opener, f"{base_url}{body['poll']}?ticket={body['ticket']}")
+                if poll_status != 200 or state["ready"]:
+                    break
+            waited += time.perf_counter() - wait_started
+        results.append((status, queued, waited, time.perf_counter() - started))
+    return results
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузка на оформление заказов: N процессов по HTTP кладут товар в корзину и создают заказы через API, "
+        "проходя очередь допуска. Нужен запущенный сервер (лучше несколько воркеров) и покупатель; "
+        "заказы создаются настоящие и списывают остаток товара --product."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--username", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--product", type=int, required=True, help="id товара, который покупают")
+        parser.add_argument("--processes", type=int, default=8)
+        parser.add_argument("--orders", type=int, default=20, help="Заказов на процесс")
+
+    def handle(self, *args: Any, **opts: Any) -> None:
+        base_url = opts["base_url"].rstrip("/")
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=opts["processes"]) as pool:
+            futures = [
+                pool.submit(_place_orders, base_url, opts["username"], opts["password"], opts["product"],
+                            opts["orders"])
+                for _ in range(opts["processes"])
+            ]
+            results = [result for future in futures for result in future.result()]
+        elapsed = time.perf_counter() - started
+
+        statuses: dict[int, int] = {}
+        for status, *_ in results:
+            statuses[status] = statuses.get(status, 0) + 1
+        created = statuses.get(200, 0)
+        waits = [waited for _, queued, waited, _ in results if queued]
+        latencies = [total for status, _, _, total in results if status == 200]
+        self.stdout.write(
+            f"Заказов: {len(results)} за {elapsed:.1f} с, создано {created} ({created / elapsed:.1f}/с); "
+            f"статусы: {', '.join(f'{k} — {v}' for k, v in sorted(statuses.items()))}"
+        )
+        self.stdout.write(
+            f"Через очередь: {len(waits)}, ожидание среднее {statistics.fmean(waits) if waits else 0:.2f} с, "
+            f"p95 {_percentile(waits, 0.95):.2f} с"
+        )
+        self.stdout.write(
+            f"Время заказа: p50 {_percentile(latencies, 0.5):.2f} с, p95 {_percentile(latencies, 0.95):.2f} с, "
+            f"max {max(latencies, default=0):.2f} с"
+        )
@@ -0,0 +1,16 @@
+from __future__ import annotations
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+
+from orders.services.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Удалить ключи Idempotency-Key старше IDEMPOTENCY_KEY_TTL (запускать по расписанию)"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        deleted = purge_expired(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {deleted}"))
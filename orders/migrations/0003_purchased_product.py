@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_purchases(apps, schema_editor):
+    OrderItem = apps.get_model("orders", "OrderItem")
+    PurchasedProduct = apps.get_model("orders", "PurchasedProduct")
+    pairs = (
+        OrderItem.objects.exclude(order__status="cancelled")
+        .values_list("order__user_id", "product_id").distinct().order_by()
+    )
+    rows = [PurchasedProduct(user_id=user_id, product_id=product_id) for user_id, product_id in pairs.iterator()]
+    PurchasedProduct.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_alter_orderitem_quantity'),
+        ('products', '0008_product_rating_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchasedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchased_products', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Купленный товар',
+                'verbose_name_plural': 'Купленные товары',
+                'unique_together': {('user', 'product')},
+            },
+        ),
+        migrations.RunPython(fill_purchases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_archived_orders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='orders_orde_updated_94e16c_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedorderitem',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+    ]
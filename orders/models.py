@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from decimal import Decimal
+from typing import Any, Collection, Optional
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db import models, transaction
 
@@ -33,6 +35,8 @@ class Order(TimeStampedModel):
 
     class Meta:
         ordering = ["-created_at"]
+        # Заказы, изменённые после прошлого расчёта рекомендаций, и кандидаты в архив
+        indexes = [models.Index(fields=["updated_at"])]
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
 
@@ -52,6 +56,9 @@ class OrderItem(models.Model):
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
     price = models.DecimalField(max_digits=10, decimal_places=2)  # snapshot price
 
+    # Товар на момент загрузки из БД: при его смене сигнал пересчитывает индекс покупок и по старому товару
+    _loaded_product_id: Optional[int] = None
+
     class Meta:
         unique_together = ("order", "product")
         verbose_name = "Позиция заказа"
@@ -59,3 +66,96 @@ class OrderItem(models.Model):
 
     def __str__(self) -> str:
         return f"{self.product} x {self.quantity}"
+
+    @classmethod
+    def from_db(cls, db: Optional[str], field_names: Collection[str], values: Collection[Any]) -> OrderItem:
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_product_id = instance.__dict__.get("product_id")
+        return instance
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        super().save(*args, **kwargs)
+        self._loaded_product_id = self.product_id
+
+
+class PurchasedProduct(models.Model):
+    """Индекс «пользователь купил товар» по неотменённым заказам; поддерживается orders.services.purchases."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="purchased_products", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="+", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "product")
+        verbose_name = "Купленный товар"
+        verbose_name_plural = "Купленные товары"
+
+    def __str__(self) -> str:
+        return f"{self.user} — {self.product}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Ключ Idempotency-Key запроса на создание заказа (orders.services.idempotency). Пока status_code
+    пустой, запрос выполняется; после — хранит ответ для повторов. Удаляется purge_idempotency_keys.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="+", on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    request_hash = models.CharField(max_length=64)
+    order = models.ForeignKey(Order, null=True, blank=True, related_name="+", on_delete=models.SET_NULL)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+        indexes = [models.Index(fields=["created_at"])]
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+
+    def __str__(self) -> str:
+        return f"{self.user_id}:{self.key} -> {self.order_id}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Завершённый заказ, перенесённый из Order командой archive_orders (orders.services.archive).
+    id совпадает с исходным: заказ доступен по прежнему адресу в API и в истории пользователя.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="archived_orders", on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=ORDER_STATUS_CHOICES)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    shipping_address = models.TextField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["user", "-created_at"])]
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архивные заказы"
+
+    def __str__(self) -> str:
+        return f"Archived order #{self.pk} — {self.user} — {self.status}"
+
+
+class ArchivedOrderItem(models.Model):
+    # id совпадает с исходной позицией OrderItem, как у ArchivedOrder
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name="items", on_delete=models.CASCADE)
+    # Архив не держит товар: удалённый товар остаётся в истории названием
+    product = models.ForeignKey(Product, null=True, related_name="+", on_delete=models.SET_NULL)
+    product_name = models.CharField(max_length=255)
+    quantity = models.IntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Позиция архивного заказа"
+        verbose_name_plural = "Позиции архивных заказов"
+
+    def __str__(self) -> str:
+        return f"{self.product_name} x {self.quantity}"
@@ -1,9 +1,10 @@
 from __future__ import annotations
 from typing import Any
+from django.db import transaction
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
 from products.serializers import ProductSerializer
-from products.models import Product
+from products.services.stock import available_stock, take_stock
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -23,6 +24,30 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ["status", "total_price", "created_at", "updated_at"]
 
 
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product = ProductSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ["id", "product", "quantity", "price"]
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """Архивный заказ в том же виде, что и OrderSerializer: клиент API их не различает."""
+
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = OrderSerializer.Meta.fields
+        read_only_fields = fields
+
+
+def serialize_order(order: Order | ArchivedOrder) -> Any:
+    serializer = ArchivedOrderSerializer if isinstance(order, ArchivedOrder) else OrderSerializer
+    return serializer(order).data
+
+
 class OrderCreateSerializer(serializers.Serializer):
     shipping_address = serializers.CharField()
 
@@ -32,8 +57,10 @@ class OrderCreateSerializer(serializers.Serializer):
         cart = Cart(request)
         if len(cart) == 0:
             raise serializers.ValidationError("Корзина пуста.")
-        for item in cart:
-            if item["quantity"] > item["product"].stock:
+        items = list(cart)
+        levels = available_stock(item["product"] for item in items)
+        for item in items:
+            if item["quantity"] > levels[item["product"].pk]:
                 raise serializers.ValidationError(f"Недостаточно товара: {item['product'].name}")
         return attrs
 
@@ -42,25 +69,59 @@ class OrderCreateSerializer(serializers.Serializer):
         user = request.user
         from .services.cart import Cart
         cart = Cart(request)
-        order = Order.objects.create(user=user, shipping_address=validated_data["shipping_address"], status="paid")
-        for item in cart:
-            OrderItem.objects.create(
-                order=order,
-                product=item["product"],
-                quantity=item["quantity"],
-                price=item["price"],
+        # Остаток мог уйти между validate и create: списание условное, при нехватке заказ откатывается.
+        # Товары — в порядке id, чтобы параллельные заказы блокировали строки в одном порядке
+        items = sorted(cart, key=lambda item: item["product"].pk)
+        with transaction.atomic():
+            order = Order.objects.create(
+                user_id=user.pk, shipping_address=validated_data["shipping_address"], status="paid"
             )
-            p: Product = item["product"]
-            p.stock -= item["quantity"]
-            p.save(update_fields=["stock"])
-        order.recalc_total()
-        cart.clear()
-        from django.core.mail import send_mail
-        send_mail(
-            subject=f"Заказ #{order.id} подтвержден",
-            message=f"Спасибо за заказ! Сумма: {order.total_price}",
-            from_email=None,
-            recipient_list=[user.email] if user.email else [],
-            fail_silently=True,
-        )
+            for item in items:
+                if not take_stock(item["product"], item["quantity"]):
+                    raise serializers.ValidationError(f"Недостаточно товара: {item['product'].name}")
+                OrderItem.objects.create(
+                    order=order,
+                    product=item["product"],
+                    quantity=item["quantity"],
+                    price=item["price"],
+                )
+            order.recalc_total()
+            # Корзина и письмо — после коммита: заказ может откатиться во внешней транзакции
+            # (run_idempotent коммитит его вместе с ключом идемпотентности)
+            transaction.on_commit(cart.clear)
+            transaction.on_commit(lambda: _send_order_email(user, order), robust=True)
         return order
+
+
+class CartOperationSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    mode = serializers.ChoiceField(choices=["add", "set", "remove"], default="add")
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        if attrs["mode"] == "add" and attrs["quantity"] < 1:
+            raise serializers.ValidationError({"quantity": "Для add количество должно быть >= 1."})
+        return attrs
+
+
+class CartBulkSerializer(serializers.Serializer):
+    max_operations = 100
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if len(value) > self.max_operations:
+            raise serializers.ValidationError(f"Не больше {self.max_operations} операций за запрос.")
+        return value
+
+
+def _send_order_email(user: Any, order: Order) -> None:
+    from django.core.mail import send_mail
+    if not hasattr(user, "email"):  # ShopTokenUser: email в токене не хранится
+        user = user.get_model()
+    send_mail(
+        subject=f"Заказ #{order.id} подтвержден",
+        message=f"Спасибо за заказ! Сумма: {order.total_price}",
+        from_email=None,
+        recipient_list=[user.email] if user.email else [],
+        fail_silently=True,
+    )
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from config.counters import incr_counter, read_counters
+
+TICKET_HEADER = "Checkout-Ticket"
+TICKET_FIELD = "checkout_ticket"
+TICKET_SALT = "orders.admission"
+
+SLOT_PREFIX = "checkout:admission:slot:"
+HEAD_KEY = "checkout:admission:head"
+TAIL_KEY = "checkout:admission:tail"
+# Когда очередь последний раз продвинулась (допуск из очереди, пропуск брошенных номеров, старт очереди)
+PROGRESS_KEY = "checkout:admission:progress"
+SKIP_LOCK_KEY = "checkout:admission:skip"
+# Номера, по которым уже допустили: повтор с тем же номером — как без номера
+USED_PREFIX = "checkout:admission:used:"
+STATS_PREFIX = "checkout:admission:stats:"
+STATS_KEYS = ("admitted", "queued", "admitted_from_queue", "wait_ms", "expired")
+
+
+@dataclass
+class Admission:
+    admitted: bool
+    # Подписанный номер в очереди: клиент присылает его при повторе (поле формы или заголовок)
+    ticket: Optional[str] = None
+    position: int = 0
+    retry_after: int = 0
+    lease: Optional[tuple[str, str]] = None
+
+
+class CheckoutGate:
+    """
+    Допуск к оформлению заказа: не больше worker_limit одновременных заказов на процесс (семафор)
+    и global_limit на все воркеры (аренды слотов в кэше — общие при Redis). Остальные встают
+    в очередь: получают подписанный номер и ждут, пока до него дойдёт окно очереди.
+
+    Слот — ключ cache.add с таймаутом slot_timeout: упавший посреди заказа воркер не уносит слот
+    навсегда. Голова очереди — число допущенных из неё: она растёт только при выданном слоте,
+    а окно — номера не дальше головы + свободных слотов, так что порядок номеров соблюдается.
+    Брошенные номера (клиент ушёл) окно не останавливают: если очередь не продвигалась два
+    интервала опроса при свободных слотах, голова сдвигается на число свободных слотов — не чаще
+    раза в интервал на все процессы. Счётчики не атомарны между собой: при гонке пара запросов
+    может пройти не по порядку — лимит слотов при этом соблюдается. Номер одноразовый: допуск
+    по нему помечается в кэше, иначе один номер проводил бы без очереди сколько угодно заказов.
+    """
+
+    def __init__(self, worker_limit: int, global_limit: int, slot_timeout: int, queue_timeout: int,
+                 poll_interval: int) -> None:
+        self.global_limit = global_limit
+        self.slot_timeout = slot_timeout
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self._worker = threading.BoundedSemaphore(worker_limit)
+
+    def enter(self, ticket: Optional[str] = None) -> Admission:
+        now = time.time()
+        number, issued = self._read_ticket(ticket)
+        if number is None:
+            head = self._head()
+            if head >= self._tail():
+                lease = self._acquire()
+                if lease is not None:
+                    _incr("admitted")
+                    return Admission(True, lease=lease)
+            number, issued = incr_counter(TAIL_KEY), now
+            if number == head + 1:  # очередь только что началась — окно ждёт с этого момента
+                cache.set(PROGRESS_KEY, now, None)
+            ticket = signing.dumps([number, issued], salt=TICKET_SALT, compress=True)
+            _incr("queued")
+        ready, head = self._window(number)
+        if ready:
+            lease = self._acquire()
+            if lease is not None:
+                if not cache.add(f"{USED_PREFIX}{number}", 1, self.queue_timeout):
+                    # Тот же номер параллельно прошёл в другом запросе
+                    self.leave(Admission(True, lease=lease))
+                    return self.enter()
+                incr_counter(HEAD_KEY)
+                cache.set(PROGRESS_KEY, now, None)
+                _incr("admitted")
+                _incr("admitted_from_queue")
+                _incr("wait_ms", int((now - issued) * 1000))
+                return Admission(True, lease=lease)
+        return Admission(False, ticket=ticket, position=max(number - head, 1), retry_after=self.poll_interval)
+
+    def leave(self, admission: Admission) -> None:
+        if admission.lease is None:
+            return
+        key, owner = admission.lease
+        # Слот могли переарендовать после истечения таймаута — удаляем только свой
+        if key and cache.get(key) == owner:
+            cache.delete(key)
+        self._worker.release()
+
+    def poll(self, ticket: str) -> Optional[dict[str, Any]]:
+        """Состояние номера для страницы ожидания: ready — можно повторять запрос. None — номер недействителен."""
+        number, _ = self._read_ticket(ticket)
+        if number is None:
+            return None
+        ready, head = self._window(number)
+        return {"ready": ready, "position": 0 if ready else max(number - head, 1), "retry_after": self.poll_interval}
+
+    def _read_ticket(self, ticket: Optional[str]) -> tuple[Optional[int], float]:
+        if not ticket:
+            return None, 0.0
+        try:
+            number, issued = signing.loads(ticket, salt=TICKET_SALT, max_age=self.queue_timeout)
+        except signing.SignatureExpired:
+            _incr("expired")
+            return None, 0.0
+        except (signing.BadSignature, TypeError, ValueError):
+            return None, 0.0
+        if cache.get(f"{USED_PREFIX}{number}") is not None:
+            return None, 0.0
+        return int(number), float(issued)
+
+    def _acquire(self) -> Optional[tuple[str, str]]:
+        if not self._worker.acquire(blocking=False):
+            return None
+        if not self.global_limit:
+            return "", ""
+        owner = uuid.uuid4().hex
+        # Со случайного слота: параллельные запросы не спорят за первый ключ
+        start = random.randrange(self.global_limit)
+        for i in range(self.global_limit):
+            key = f"{SLOT_PREFIX}{(start + i) % self.global_limit}"
+            if cache.add(key, owner, self.slot_timeout):
+                return key, owner
+        self._worker.release()
+        return None
+
+    def _free_slots(self) -> int:
+        if not self.global_limit:
+            return 1
+        taken = cache.get_many([f"{SLOT_PREFIX}{i}" for i in range(self.global_limit)])
+        return self.global_limit - len(taken)
+
+    def active(self) -> int:
+        return self.global_limit - self._free_slots() if self.global_limit else 0
+
+    def _head(self) -> int:
+        return int(cache.get(HEAD_KEY) or 0)
+
+    def _tail(self) -> int:
+        return int(cache.get(TAIL_KEY) or 0)
+
+    def _window(self, number: int) -> tuple[bool, int]:
+        """Попадает ли номер в окно очереди (голова + свободные слоты). Возвращает (да/нет, голова)."""
+        head = self._head()
+        free = self._free_slots()
+        if free > 0 and number - head > free:
+            head = self._skip_abandoned(head, free)
+        return free > 0 and number - head <= free, head
+
+    def _skip_abandoned(self, head: int, free: int) -> int:
+        progress = float(cache.get(PROGRESS_KEY) or 0)
+        if time.time() - progress < 2 * self.poll_interval or not cache.add(SKIP_LOCK_KEY, 1, self.poll_interval):
+            return head
+        step = min(free, self._tail() - head)
+        if step <= 0:
+            return head
+        cache.set(PROGRESS_KEY, time.time(), None)
+        return incr_counter(HEAD_KEY, step)
+
+    def queue_depth(self) -> int:
+        return max(self._tail() - self._head(), 0)
+
+
+def _incr(name: str, delta: int = 1) -> None:
+    incr_counter(STATS_PREFIX + name, delta)
+
+
+@lru_cache(maxsize=1)
+def get_gate() -> Optional[CheckoutGate]:
+    conf: dict[str, Any] = settings.CHECKOUT_ADMISSION
+    if not conf["ENABLED"]:
+        return None
+    return CheckoutGate(conf["WORKER_LIMIT"], conf["GLOBAL_LIMIT"], conf["SLOT_TIMEOUT"], conf["QUEUE_TIMEOUT"],
+                        conf["POLL_INTERVAL"])
+
+
+@contextmanager
+def admit(ticket: Optional[str] = None) -> Iterator[Admission]:
+    """Оборачивает создание заказа: внутри with — занятый слот, если admission.admitted; иначе — место в очереди."""
+    gate = get_gate()
+    if gate is None:
+        yield Admission(True)
+        return
+    admission = gate.enter(ticket)
+    try:
+        yield admission
+    finally:
+        gate.leave(admission)
+
+
+def admission_stats() -> dict[str, int]:
+    """Счётчики с момента старта кэша и текущее состояние: занятые слоты, длина очереди, среднее ожидание."""
+    stats = read_counters(STATS_PREFIX, STATS_KEYS)
+    gate = get_gate()
+    stats["active"] = gate.active() if gate else 0
+    stats["queue_depth"] = gate.queue_depth() if gate else 0
+    stats["avg_wait_ms"] = stats["wait_ms"] // stats["admitted_from_queue"] if stats["admitted_from_queue"] else 0
+    return stats
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from orders.models import ArchivedOrder, ArchivedOrderItem, IdempotencyKey, Order, OrderItem
+from orders.services.history import invalidate_order_summary
+
+# Заказы в этих статусах больше не меняются — их можно уносить из рабочих таблиц
+ARCHIVE_STATUSES = ("delivered", "cancelled")
+
+
+@dataclass
+class ArchiveStats:
+    cutoff: datetime
+    batches: int = 0
+    orders: int = 0
+    items: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+def archive_cutoff(days: int) -> datetime:
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(cutoff: datetime, batch_size: int, stats: ArchiveStats) -> int:
+    """
+    Переносит пачку завершённых заказов, не менявшихся с cutoff, в ArchivedOrder/ArchivedOrderItem
+    и удаляет их из Order/OrderItem в той же транзакции. Возвращает размер пачки.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(status__in=ARCHIVE_STATUSES, updated_at__lt=cutoff)
+            .order_by("pk")[:batch_size]
+        )
+        if not orders:
+            return 0
+        ids = [order.pk for order in orders]
+        items = list(OrderItem.objects.filter(order_id__in=ids).select_related("product").only(
+            "id", "order_id", "product_id", "quantity", "price", "product__name"
+        ))
+        ArchivedOrder.objects.bulk_create(
+            ArchivedOrder(
+                id=order.pk, user_id=order.user_id, status=order.status, total_price=order.total_price,
+                shipping_address=order.shipping_address, created_at=order.created_at, updated_at=order.updated_at,
+            )
+            for order in orders
+        )
+        ArchivedOrderItem.objects.bulk_create(
+            # id позиции сохраняется, как и id заказа: /api/orders/<id>/ отдаёт те же id позиций
+            ArchivedOrderItem(
+                id=item.pk, order_id=item.order_id, product_id=item.product_id, product_name=item.product.name,
+                quantity=item.quantity, price=item.price,
+            )
+            for item in items
+        )
+        IdempotencyKey.objects.filter(order_id__in=ids).update(order=None)
+        # Удаляем одним DELETE на таблицу, а не через delete(): тот загрузил бы каждую строку и послал
+        # post_delete, а orders.signals.remove_purchase на каждую позицию пересчитывает индекс покупок
+        # отдельным запросом — сотни запросов на пачку ради того же результата (архивные позиции индекс
+        # учитывает), итоги сбрасываются ниже одним вызовом. Каскадов здесь нет: все ссылки на Order
+        # (позиции, ключи идемпотентности) обработаны выше — новую ссылку на Order нужно обработать здесь же.
+        _delete_rows(OrderItem, "order_id", ids)
+        _delete_rows(Order, "id", ids)
+    invalidate_order_summary(*(order.user_id for order in orders))
+
+    stats.batches += 1
+    stats.orders += len(orders)
+    stats.items += len(items)
+    return len(orders)
+
+
+def _delete_rows(model: type[models.Model], column: str, ids: list[int]) -> None:
+    """DELETE FROM <таблица модели> WHERE column IN (ids) — без загрузки строк и сигналов."""
+    qn = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(column)} IN ({placeholders})", ids)
+
+
+def archive_orders(
+    days: int,
+    batch_size: int = 500,
+    max_batches: Optional[int] = None,
+    progress: Optional[Callable[[ArchiveStats], None]] = None,
+) -> ArchiveStats:
+    stats = ArchiveStats(cutoff=archive_cutoff(days))
+    while max_batches is None or stats.batches < max_batches:
+        if not archive_batch(stats.cutoff, batch_size, stats):
+            break
+        if progress:
+            progress(stats)
+    return stats
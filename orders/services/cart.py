@@ -4,6 +4,7 @@ from decimal import Decimal
 from typing import Iterator, Dict, Any
 from django.http import HttpRequest
 from products.models import Product
+from products.services.stock import available_stock
 
 CART_SESSION_ID = "cart"
 
@@ -11,10 +12,8 @@ CART_SESSION_ID = "cart"
 class Cart:
     def __init__(self, request: HttpRequest) -> None:
         self.session = request.session
-        cart = self.session.get(CART_SESSION_ID)
-        if not cart:
-            cart = self.session[CART_SESSION_ID] = {}
-        self.cart: dict[str, dict[str, str | int]] = cart
+        # Чтение не пишет в сессию: пустая корзина не создаёт сессию посетителю
+        self.cart: dict[str, dict[str, str | int]] = self.session.get(CART_SESSION_ID) or {}
 
     def add(self, product: Product, quantity: int = 1, override: bool = False) -> None:
         pid = str(product.id)
@@ -32,6 +31,45 @@ class Cart:
             del self.cart[pid]
             self.save()
 
+    def apply(self, operations: list[dict[str, Any]]) -> tuple[bool, list[dict[str, Any]]]:
+        """
+        Пакет операций {product_id, quantity, mode} с mode: add — прибавить, set — установить
+        (0 — удалить), remove — удалить. Товары проверяются одним запросом; операции применяются
+        по порядку к копии корзины, и та сохраняется в сессию один раз — только если ошибок нет.
+        Возвращает (успех, результаты по строкам).
+        """
+        ids = {op["product_id"] for op in operations}
+        products = Product.objects.filter(id__in=ids, is_active=True).only(
+            "id", "price", "stock", "stock_shards"
+        ).in_bulk()
+        levels = available_stock(products.values())
+        cart = {pid: dict(item) for pid, item in self.cart.items()}
+        results: list[dict[str, Any]] = []
+        for op in operations:
+            pid, mode, qty = str(op["product_id"]), op["mode"], op["quantity"]
+            current = int(cart[pid]["quantity"]) if pid in cart else 0
+            new_qty = 0 if mode == "remove" else qty if mode == "set" else current + qty
+            product = products.get(op["product_id"])
+            error = None
+            if new_qty > 0 and product is None:
+                error = "Товар не найден."
+            elif product is not None and new_qty > levels[product.pk]:
+                error = f"Недостаточно товара на складе (доступно {levels[product.pk]})."
+            if error is None:
+                if new_qty > 0 and product is not None:
+                    cart[pid] = {"quantity": new_qty, "price": str(cart.get(pid, {}).get("price", product.price))}
+                else:
+                    cart.pop(pid, None)
+            results.append({
+                "product_id": op["product_id"], "mode": mode, "ok": error is None,
+                "quantity": current if error else new_qty, "error": error,
+            })
+        ok = all(r["ok"] for r in results)
+        if ok:
+            self.cart = cart
+            self.save()
+        return ok, results
+
     def clear(self) -> None:
         self.session[CART_SESSION_ID] = {}
         self.session.modified = True
@@ -64,6 +102,8 @@ class Cart:
         return sum((item["total_price"] for item in self), Decimal("0.00"))
 
     def to_dict(self) -> dict:
+        # Один проход по корзине — один запрос товаров
+        items = list(self)
         return {
             "items": [
                 {
@@ -73,7 +113,7 @@ class Cart:
                     "quantity": item["quantity"],
                     "total": str(item["total_price"]),
                 }
-                for item in self
+                for item in items
             ],
-            "total": str(self.get_total_price()),
+            "total": str(sum((item["total_price"] for item in items), Decimal("0.00"))),
         }
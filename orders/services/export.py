@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import csv
+from typing import Any, Iterable, Iterator
+
+from django.db.models import Prefetch, QuerySet
+from django.http import StreamingHttpResponse
+
+from config.keyset import iter_keyset
+from orders.models import Order, OrderItem
+
+ORDER_CSV_HEADER = [
+    "order_id", "created_at", "status", "user_id", "username", "email", "shipping_address", "total_price",
+    "item_id", "product_id", "product_name", "quantity", "price", "line_total",
+]
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: write() возвращает строку вместо записи."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_order_rows(qs: QuerySet[Order], chunk_size: int = 500) -> Iterator[list[Any]]:
+    items_qs = OrderItem.objects.select_related("product").only(
+        "id", "order_id", "quantity", "price", "product__id", "product__name"
+    ).order_by("pk")
+    qs = qs.select_related("user").prefetch_related(Prefetch("items", queryset=items_qs))
+    yield ORDER_CSV_HEADER
+    for chunk in iter_keyset(qs, chunk_size):
+        for order in chunk:
+            head = [
+                order.pk, order.created_at.isoformat(), order.status, order.user_id,
+                order.user.username, order.user.email, order.shipping_address, order.total_price,
+            ]
+            items = list(order.items.all())
+            if not items:
+                yield head + [""] * 6
+            for item in items:
+                yield head + [
+                    item.pk, item.product_id, item.product.name, item.quantity, item.price,
+                    item.price * item.quantity,
+                ]
+
+
+def iter_analytics_rows(data: dict[str, Any]) -> Iterator[list[Any]]:
+    yield ["section", "key", "value", "extra"]
+    yield ["orders", "revenue", data["revenue"], ""]
+    yield ["orders", "orders_count", data["orders_count"], ""]
+    for s in data["by_status"]:
+        yield ["by_status", s["status"], s["c"], ""]
+    for it in data["top_sold"]:
+        yield ["top_sold", it["product__name"], it["qty"], it["sum"]]
+    yield ["views", "total_views", data["total_views"], ""]
+    for p in data["top_viewed"]:
+        yield ["top_viewed", p["name"], p["view_count"], ""]
+    for d in data["daily"]:
+        yield ["daily", d["day"].isoformat(), d["c"], d["sum"]]
+    split = data["user_split"]
+    for key in ("registered", "admins", "cms", "regular"):
+        yield ["users", key, split[key], ""]
+    for key, value in split["views"].items():
+        yield ["views_by_user_type", key, value, ""]
+    for key, value in data["view_dedup"].items():
+        yield ["view_writes", key, value, ""]
+    for key, value in data["api_throttled"].items():
+        yield ["api_throttled", key, value, ""]
+    for key, value in data["checkout_admission"].items():
+        yield ["checkout_admission", key, value, ""]
+
+
+def csv_streaming_response(rows: Iterable[list[Any]], filename: str) -> StreamingHttpResponse:
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any, Optional, Union, overload
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import BooleanField, Count, Max, Prefetch, Q, QuerySet, Sum, Value
+
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ORDERS_PAGE_SIZE = 10
+SUMMARY_CACHE_PREFIX = "orders:summary:"
+
+
+AnyOrder = Union[Order, ArchivedOrder]
+
+
+class OrderHistory(Sequence[AnyOrder]):
+    """
+    Заказы из рабочей и архивной таблиц одной лентой (-created_at, -id) — для Paginator и пагинации DRF.
+    Ключи страницы выбираются UNION по обеим таблицам, сами заказы — in_bulk из каждой (с prefetch querysets).
+    """
+
+    def __init__(self, orders: QuerySet[Order], archived: QuerySet[ArchivedOrder]) -> None:
+        self.orders = orders
+        self.archived = archived
+        self._count: Optional[int] = None
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = self.orders.count() + self.archived.count()
+        return self._count
+
+    @overload
+    def __getitem__(self, index: int) -> AnyOrder:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[AnyOrder]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[AnyOrder, list[AnyOrder]]:
+        if isinstance(index, int):
+            return self[index:index + 1][0]
+        hot_keys = self.orders.order_by().values_list("id", "created_at", Value(False, output_field=BooleanField()))
+        cold_keys = self.archived.order_by().values_list("id", "created_at", Value(True, output_field=BooleanField()))
+        keys = list(hot_keys.union(cold_keys, all=True).order_by("-created_at", "-id")[index])
+        hot = self.orders.in_bulk([pk for pk, _, archived in keys if not archived])
+        cold = self.archived.in_bulk([pk for pk, _, archived in keys if archived])
+        return [cold[pk] if archived else hot[pk] for pk, _, archived in keys]
+
+
+def user_order_history(user_id: int) -> OrderHistory:
+    """Все заказы пользователя (включая архивные) с позициями и товарами — как в API."""
+    return OrderHistory(
+        Order.objects.filter(user_id=user_id).prefetch_related("items__product"),
+        ArchivedOrder.objects.filter(user_id=user_id).prefetch_related("items__product"),
+    )
+
+
+def order_history_page(user_id: int, page_number: Any) -> Page:
+    """
+    Страница заказов пользователя (включая архивные) с позициями и товарами — фиксированное число
+    запросов независимо от длины истории.
+    """
+    product_fields = ("product__id", "product__name", "product__slug")
+    items = OrderItem.objects.select_related("product").only(
+        "id", "order_id", "quantity", "price", *product_fields
+    ).order_by("pk")
+    archived_items = ArchivedOrderItem.objects.select_related("product").only(
+        "id", "order_id", "product_name", "quantity", "price", *product_fields
+    ).order_by("pk")
+    history = OrderHistory(
+        Order.objects.filter(user_id=user_id).prefetch_related(Prefetch("items", queryset=items)),
+        ArchivedOrder.objects.filter(user_id=user_id).prefetch_related(Prefetch("items", queryset=archived_items)),
+    )
+    return Paginator(history, ORDERS_PAGE_SIZE).get_page(page_number)
+
+
+def _summary_key(user_id: int) -> str:
+    return f"{SUMMARY_CACHE_PREFIX}{user_id}"
+
+
+def order_summary(user_id: int) -> dict[str, Any]:
+    """Итоги по заказам пользователя; кэшируются до изменения любого его заказа."""
+    summary: Optional[dict[str, Any]] = cache.get(_summary_key(user_id))
+    if summary is None:
+        active = ~Q(status="cancelled")
+        aggregates = dict(
+            count=Count("id"),
+            active_count=Count("id", filter=active),
+            total_spent=Sum("total_price", filter=active),
+            last_order_at=Max("created_at"),
+        )
+        hot = Order.objects.filter(user_id=user_id).aggregate(**aggregates)
+        cold = ArchivedOrder.objects.filter(user_id=user_id).aggregate(**aggregates)
+        summary = {
+            "count": hot["count"] + cold["count"],
+            "active_count": hot["active_count"] + cold["active_count"],
+            "total_spent": (hot["total_spent"] or Decimal("0.00")) + (cold["total_spent"] or Decimal("0.00")),
+            "last_order_at": max(filter(None, (hot["last_order_at"], cold["last_order_at"])), default=None),
+        }
+        cache.set(_summary_key(user_id), summary, None)
+    return summary
+
+
+def invalidate_order_summary(*user_ids: int) -> None:
+    cache.delete_many([_summary_key(user_id) for user_id in set(user_ids)])
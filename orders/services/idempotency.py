@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Mapping, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from orders.models import IdempotencyKey, Order
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 64
+
+
+class IdempotencyError(Exception):
+    """Запрос с ключом нельзя ни выполнить, ни повторить: 409 — ещё выполняется, 422 — другие данные."""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class StoredResponse:
+    order_id: Optional[int]
+    status_code: int
+    body: Any
+    replayed: bool
+
+
+def valid_key(key: str) -> bool:
+    return 0 < len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+def request_fingerprint(data: Mapping[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def _claim(user_id: int, key: str, request_hash: str) -> tuple[IdempotencyKey, bool]:
+    """
+    Вставка строки (user, key) — и есть блокировка: из параллельных дублей вставить её сможет один,
+    остальные получат IntegrityError и увидят его запись. Возвращает (запись, выполнять ли запрос).
+    """
+    conf: dict[str, Any] = settings.IDEMPOTENCY_KEY
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user_id=user_id, key=key, request_hash=request_hash), True
+    except IntegrityError:
+        pass
+    record = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+    if record is None:  # прежний владелец ключа только что откатился
+        raise IdempotencyError(409, "Запрос с этим ключом ещё выполняется, повторите позже.")
+    expired = record.created_at < now - timedelta(seconds=conf["TTL"])
+    if not expired and record.request_hash != request_hash:
+        raise IdempotencyError(422, "Ключ уже использован с другими параметрами запроса.")
+    if record.status_code is not None and not expired:
+        return record, False
+    # Истёкший ключ или незавершённый запрос, оборвавшийся дольше LOCK_TIMEOUT назад, — забираем себе
+    stale = now - timedelta(seconds=conf["TTL"] if record.status_code is not None else conf["LOCK_TIMEOUT"])
+    claimed = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at, created_at__lt=stale).update(
+        created_at=now, request_hash=request_hash, order=None, status_code=None, response=None,
+    )
+    if not claimed:
+        raise IdempotencyError(409, "Запрос с этим ключом ещё выполняется, повторите позже.")
+    return record, True
+
+
+def run_idempotent(
+    user_id: int, key: str, request_hash: str,
+    create: Callable[[], tuple[Order, Any]], status_code: int = 201,
+) -> StoredResponse:
+    """
+    Создаёт заказ не больше одного раза на ключ. Повтор получает сохранённый ответ — без корзины,
+    списания остатков и письма. Заказ и ответ в записи ключа коммитятся одной транзакцией: заказа
+    без завершённого ключа не бывает. Если транзакция откатилась, ключ освобождается — запрос можно повторить.
+    """
+    record, claimed = _claim(user_id, key, request_hash)
+    if not claimed:
+        return StoredResponse(record.order_id, record.status_code or status_code, record.response, True)
+    try:
+        with transaction.atomic():
+            order, body = create()
+            IdempotencyKey.objects.filter(pk=record.pk).update(order=order, status_code=status_code, response=body)
+    except BaseException:
+        # Ответ в ключе появляется только вместе с заказом: если он есть, заказ закоммичен (упало уже после
+        # коммита, например on_commit) — ключ не трогаем, повтор получит сохранённый ответ
+        IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+        raise
+    return StoredResponse(order.pk, status_code, body, False)
+
+
+def purge_expired(batch_size: int = 5000) -> int:
+    """Удаляет ключи старше IDEMPOTENCY_KEY["TTL"] пачками. Возвращает число удалённых."""
+    conf: dict[str, Any] = settings.IDEMPOTENCY_KEY
+    cutoff = timezone.now() - timedelta(seconds=conf["TTL"])
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
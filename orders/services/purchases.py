@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from django.db import transaction
+
+from orders.models import ArchivedOrderItem, OrderItem, PurchasedProduct
+
+
+def record_purchases(user_id: int, product_ids: Iterable[int]) -> None:
+    """Отмечает товары купленными (идемпотентно)."""
+    PurchasedProduct.objects.bulk_create(
+        [PurchasedProduct(user_id=user_id, product_id=pid) for pid in set(product_ids)],
+        ignore_conflicts=True,
+    )
+
+
+@transaction.atomic
+def refresh_purchases(user_id: int, product_ids: Iterable[int]) -> None:
+    """
+    Пересчитывает индекс для указанных товаров пользователя по его неотменённым заказам
+    (включая архивные): нужен после отмены (или возврата из отмены) заказа и правки его позиций.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    bought = set(
+        OrderItem.objects.filter(order__user_id=user_id, product_id__in=product_ids)
+        .exclude(order__status="cancelled")
+        .values_list("product_id", flat=True)
+    )
+    bought.update(
+        ArchivedOrderItem.objects.filter(order__user_id=user_id, product_id__in=product_ids - bought)
+        .exclude(order__status="cancelled")
+        .values_list("product_id", flat=True)
+    )
+    PurchasedProduct.objects.filter(user_id=user_id, product_id__in=product_ids - bought).delete()
+    record_purchases(user_id, bought)
+
+
+def refresh_purchases_for_orders(order_ids: Iterable[Any]) -> None:
+    """Пересчёт для всех (пользователь, товар) из заказов — для массовой смены статуса через update()."""
+    by_user: dict[int, set[int]] = {}
+    rows = OrderItem.objects.filter(order_id__in=list(order_ids)).values_list("order__user_id", "product_id")
+    for user_id, product_id in rows:
+        by_user.setdefault(user_id, set()).add(product_id)
+    for user_id, product_ids in by_user.items():
+        refresh_purchases(user_id, product_ids)
+
+
+def purchased_product_ids(user: Any, product_ids: Iterable[int]) -> set[int]:
+    """Какие из товаров пользователь купил — одним запросом по индексу."""
+    if not getattr(user, "is_authenticated", False):
+        return set()
+    product_ids = list(product_ids)
+    if not product_ids:
+        return set()
+    return set(
+        PurchasedProduct.objects.filter(user_id=user.pk, product_id__in=product_ids)
+        .values_list("product_id", flat=True)
+    )
+
+
+def has_purchased(user: Any, product_id: int) -> bool:
+    return bool(purchased_product_ids(user, [product_id]))
@@ -0,0 +1,40 @@
+from __future__ import annotations
+from typing import Any, Optional, Type
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Order, OrderItem
+from .services.history import invalidate_order_summary
+from .services.purchases import record_purchases, refresh_purchases, refresh_purchases_for_orders
+
+
+@receiver(post_save, sender=Order)
+def update_purchases_on_status(sender: Type[Order], instance: Order, created: bool,
+                               update_fields: Optional[frozenset[str]] = None, **kwargs: Any) -> None:
+    # Новый заказ ещё без позиций; дальше пересчитываем только при возможной смене статуса
+    if created or (update_fields is not None and "status" not in update_fields):
+        return
+    refresh_purchases_for_orders([instance.pk])
+
+
+@receiver(post_save, sender=OrderItem)
+def add_purchase(sender: Type[OrderItem], instance: OrderItem, **kwargs: Any) -> None:
+    previous = instance._loaded_product_id
+    # Товар позиции сменили (например, в инлайне админки): старый мог остаться купленным только по ней
+    if previous is not None and previous != instance.product_id:
+        refresh_purchases(instance.order.user_id, [previous, instance.product_id])
+    elif instance.order.status != "cancelled":
+        record_purchases(instance.order.user_id, [instance.product_id])
+
+
+@receiver(post_delete, sender=OrderItem)
+def remove_purchase(sender: Type[OrderItem], instance: OrderItem, **kwargs: Any) -> None:
+    order = Order.objects.filter(pk=instance.order_id).only("user_id").first()
+    # При каскадном удалении заказа позиции удаляются раньше самого заказа
+    if order is not None:
+        refresh_purchases(order.user_id, [instance.product_id])
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def reset_order_summary(sender: Type[Order], instance: Order, **kwargs: Any) -> None:
+    invalidate_order_summary(instance.user_id)
@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import List, Union
 from django.urls import path, include, URLPattern, URLResolver
 from rest_framework.routers import DefaultRouter
-from .views import cart_detail, cart_add, cart_remove, checkout, OrderViewSet
+from .views import cart_detail, cart_add, cart_remove, checkout, checkout_queue, OrderViewSet
 
 
 app_name = "orders"
@@ -14,6 +14,7 @@ urlpatterns: List[Union[URLPattern, URLResolver]] = [
     path("cart/add/<int:product_id>/", cart_add, name="cart_add"),
     path("cart/remove/<int:product_id>/", cart_remove, name="cart_remove"),
     path("checkout/", checkout, name="checkout"),
+    path("checkout/queue/", checkout_queue, name="checkout_queue"),
 ]
 
 # API
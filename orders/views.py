@@ -1,23 +1,28 @@
 from __future__ import annotations
+import uuid
 from typing import Any, cast
-from django.contrib.auth.models import User
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.urls import reverse
 from django.db.models import QuerySet
 
 from rest_framework import viewsets, permissions
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 
 from .forms import CheckoutForm
-from .models import Order
-from .serializers import OrderSerializer, OrderCreateSerializer
+from .models import ArchivedOrder, Order
+from .serializers import OrderSerializer, OrderCreateSerializer, serialize_order
+from .services import admission, idempotency
+from .services.history import AnyOrder, user_order_history
 from .services.cart import Cart
 from products.models import Product
+from products.services.stock import available_stock
 
 
 # Web views
@@ -35,7 +40,7 @@ def cart_add(request: HttpRequest, product_id: int) -> HttpResponse:
     if quantity < 1:
         messages.error(request, "Количество должно быть >= 1.")
         return redirect(product.get_absolute_url())
-    if product.stock < quantity:
+    if available_stock([product])[product.pk] < quantity:
         messages.error(request, "Недостаточно товара на складе.")
         return redirect(product.get_absolute_url())
     cart.add(product, quantity)
@@ -54,27 +59,67 @@ def cart_remove(request: HttpRequest, product_id: int) -> HttpResponse:
 @login_required
 def checkout(request: HttpRequest) -> HttpResponse:
     cart = Cart(request)
-    if len(cart) == 0:
+    # Повторная отправка уже оформленного заказа приходит с пустой корзиной — её разбирает ключ идемпотентности
+    if len(cart) == 0 and request.method != "POST":
         messages.warning(request, "Корзина пуста.")
         return redirect("products:product_list")
     if request.method == "POST":
         form = CheckoutForm(request.POST)
         if form.is_valid():
-            serializer = OrderCreateSerializer(data=form.cleaned_data, context={"request": request})
-            serializer.is_valid(raise_exception=True)
-            order = serializer.save()
-            messages.success(request, f"Заказ #{order.id} создан. Спасибо!")
+            data = {k: v for k, v in form.cleaned_data.items() if k != "idempotency_key"}
+            serializer = OrderCreateSerializer(data=data, context={"request": request})
+
+            def create_order() -> tuple[Order, Any]:
+                serializer.is_valid(raise_exception=True)
+                order = serializer.save()
+                return order, OrderSerializer(order).data
+
+            with admission.admit(request.POST.get(admission.TICKET_FIELD)) as entry:
+                if not entry.admitted:
+                    # Пик: заказ ждёт своей очереди, страница ожидания сама повторит отправку формы
+                    return render(request, "checkout/waiting_room.html", {"form": form, "entry": entry})
+                try:
+                    # Ключ из скрытого поля формы: двойной клик или «назад» + F5 не создадут второй заказ
+                    result = idempotency.run_idempotent(
+                        cast(int, request.user.pk), form.cleaned_data["idempotency_key"],
+                        idempotency.request_fingerprint(data), create_order,
+                    )
+                except idempotency.IdempotencyError as exc:
+                    messages.info(request, exc.detail)
+                    return redirect("users:account")
+                except ValidationError as exc:
+                    # Остаток мог закончиться, пока покупатель оформлял заказ
+                    detail = (exc.detail.get("non_field_errors", exc.detail) if isinstance(exc.detail, dict)
+                              else exc.detail)
+                    messages.error(request, " ".join(str(error) for error in detail))
+                    return redirect("orders:cart_detail")
+            if result.replayed:
+                messages.info(request, f"Заказ #{result.order_id} уже создан.")
+            else:
+                messages.success(request, f"Заказ #{result.order_id} создан. Спасибо!")
             return redirect("users:account")
     else:
-        form = CheckoutForm()
+        form = CheckoutForm(initial={"idempotency_key": uuid.uuid4().hex})
     return render(request, "checkout/checkout.html", {"cart": cart, "form": form})
 
 
+def checkout_queue(request: HttpRequest) -> JsonResponse:
+    """Опрос очереди оформления по номеру: страница ожидания и API-клиенты повторяют заказ, когда ready."""
+    gate = admission.get_gate()
+    if gate is None:
+        return JsonResponse({"ready": True, "position": 0, "retry_after": 0})
+    state = gate.poll(request.GET.get("ticket", ""))
+    if state is None:
+        return JsonResponse({"detail": "Номер в очереди недействителен или истёк."}, status=400)
+    return JsonResponse(state)
+
+
 # REST API
 
 class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request: Request, view: Any, obj: Order) -> bool:
-        return obj.user == request.user
+        # Сравнение по id: request.user может быть ShopTokenUser без строки в БД
+        return bool(obj.user_id == request.user.pk)
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -82,19 +127,76 @@ class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
     def get_queryset(self) -> QuerySet[Order]:
-        user: User = cast(User, self.request.user)  # IsAuthenticated гарантирует User
-        return Order.objects.filter(user=user).prefetch_related("items__product")
+        # IsAuthenticated гарантирует пользователя (User или ShopTokenUser)
+        user_id = cast(int, self.request.user.pk)
+        return Order.objects.filter(user_id=user_id).prefetch_related("items__product")
 
     def get_serializer_class(self) -> type[OrderCreateSerializer | OrderSerializer]:
         if self.action == "create":
             return OrderCreateSerializer
         return OrderSerializer
 
+    def get_object(self) -> AnyOrder:
+        try:
+            return super().get_object()
+        except Http404:
+            # Старые завершённые заказы перенесены в архив (archive_orders) — доступны только на чтение
+            if self.request.method not in permissions.SAFE_METHODS:
+                raise
+        order = get_object_or_404(
+            ArchivedOrder.objects.filter(user_id=cast(int, self.request.user.pk)).prefetch_related("items__product"),
+            pk=self.kwargs["pk"],
+        )
+        self.check_object_permissions(self.request, order)
+        return order
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        # Рабочие и архивные заказы одной лентой; страница собирается по запросу на таблицу
+        history = user_order_history(cast(int, request.user.pk))
+        page = self.paginate_queryset(history)
+        if page is None:
+            return Response([serialize_order(order) for order in history[:]])
+        return self.get_paginated_response([serialize_order(order) for order in page])
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return Response(serialize_order(self.get_object()))
+
     def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         serializer = OrderCreateSerializer(data=request.data, context={"request": request})
-        serializer.is_valid(raise_exception=True)
-        order = serializer.save()
-        return Response(OrderSerializer(order).data)
+
+        def create_order() -> tuple[Order, Any]:
+            serializer.is_valid(raise_exception=True)
+            order = serializer.save()
+            return order, OrderSerializer(order).data
+
+        with admission.admit(request.headers.get(admission.TICKET_HEADER)) as entry:
+            if not entry.admitted:
+                return Response(
+                    {
+                        "detail": "Много заказов одновременно: запрос поставлен в очередь.",
+                        "ticket": entry.ticket,
+                        "position": entry.position,
+                        "poll": reverse("orders:checkout_queue"),
+                    },
+                    status=503, headers={"Retry-After": str(entry.retry_after)},
+                )
+            key = request.headers.get(idempotency.HEADER)
+            if key is None:
+                return Response(create_order()[1])
+            if not idempotency.valid_key(key):
+                return Response({"detail": f"{idempotency.HEADER}: от 1 до {idempotency.MAX_KEY_LENGTH} символов."},
+                                status=400)
+            try:
+                result = idempotency.run_idempotent(
+                    cast(int, request.user.pk), key, idempotency.request_fingerprint(request.data),
+                    create_order, status_code=200,
+                )
+            except idempotency.IdempotencyError as exc:
+                return Response({"detail": exc.detail}, status=exc.status_code)
+        response = Response(result.body, status=result.status_code)
+        if result.replayed:
+            response["Idempotent-Replayed"] = "true"
+        return response
 
     @action(detail=True, methods=["patch"])
     def cancel(self, request: Request, pk: int | str | None = None) -> Response:
@@ -102,5 +204,5 @@ class OrderViewSet(viewsets.ModelViewSet):
         if order.status in ["shipped", "delivered"]:
             return Response({"detail": "Нельзя отменить отправленный/доставленный заказ."}, status=400)
         order.status = "cancelled"
-        order.save(update_fields=["status"])
+        order.save(update_fields=["status", "updated_at"])
         return Response(OrderSerializer(order).data)
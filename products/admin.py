@@ -1,15 +1,43 @@
 from __future__ import annotations
+from datetime import timedelta
 from typing import Any, Optional
+from django.conf import settings
 from django.http import HttpRequest
 from django.contrib import admin
-from django.db.models import Avg, QuerySet
-from .models import Category, Product, Review, ProductView
+from django.db.models import QuerySet
+from django.forms import ModelForm
+from django.utils import timezone
+from .models import Category, Product, Review, ProductView, ProductViewDaily
+from .paginators import EstimatedCountPaginator
+from .services.stock import set_stock, shard_stock
+
+
+class RecentPeriodFilter(admin.SimpleListFilter):
+    """
+    Замена date_hierarchy для больших таблиц: фиксированные периоды,
+    для построения вариантов не нужен запрос DISTINCT по датам всей таблицы.
+    """
+
+    title = "Период"
+    parameter_name = "period"
+    periods = {"1": ("Сегодня", 1), "7": ("7 дней", 7), "30": ("30 дней", 30), "90": ("90 дней", 90)}
+
+    def lookups(self, request: HttpRequest, model_admin: admin.ModelAdmin) -> list[tuple[str, str]]:
+        return [(key, label) for key, (label, _) in self.periods.items()]
+
+    def queryset(self, request: HttpRequest, queryset: QuerySet[Any]) -> QuerySet[Any]:
+        period = self.periods.get(self.value() or "")
+        if period is None:
+            return queryset
+        since = timezone.now() - timedelta(days=period[1])
+        return queryset.filter(created_at__gte=since)
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
     list_display = ("name", "parent", "created_at")
+    list_select_related = ("parent",)
     search_fields = ("name",)
     list_filter = ("parent",)
 
@@ -19,36 +47,76 @@ class ProductAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
     list_display = ("name", "category", "price", "stock", "is_active", "avg_rating", "view_count", "created_at")
     list_filter = ("category", "is_active",)
+    list_select_related = ("category",)
     search_fields = ("name", "description")
     autocomplete_fields = ("category",)
+    readonly_fields = ("rating_avg", "reviews_count", "view_count", "stock_shards")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["enable_stock_shards", "disable_stock_shards"]
 
-    def get_queryset(self, request: Any) -> QuerySet[Product]:
-        qs = super().get_queryset(request)
-        return qs.annotate(_avg=Avg("reviews__rating"))
-
-    @admin.display(description="Средний рейтинг")
+    @admin.display(description="Средний рейтинг", ordering="rating_avg")
     def avg_rating(self, obj: Product) -> float:
-        val = getattr(obj, "_avg", None)
-        return round(float(val or 0.0), 2)
+        return round(obj.rating_avg, 2)
+
+    def save_model(self, request: HttpRequest, obj: Product, form: ModelForm, change: bool) -> None:
+        super().save_model(request, obj, form, change)
+        if change and obj.stock_shards and "stock" in form.changed_data:
+            set_stock(obj, obj.stock)
+
+    @admin.action(description="Разбить остаток на шарды (для распродаж)")
+    def enable_stock_shards(self, request: HttpRequest, queryset: QuerySet[Product]) -> None:
+        for product in queryset:
+            shard_stock(product, settings.STOCK_SHARDS)
+        self.message_user(request, f"Остаток разбит на {settings.STOCK_SHARDS} шардов: {queryset.count()} товаров.")
+
+    @admin.action(description="Собрать остаток обратно в товар")
+    def disable_stock_shards(self, request: HttpRequest, queryset: QuerySet[Product]) -> None:
+        for product in queryset.filter(stock_shards__gt=0):
+            shard_stock(product, 0)
+        self.message_user(request, "Шардирование остатка выключено.")
 
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ("product", "user", "rating", "created_at")
     list_filter = ("rating",)
+    list_select_related = ("product", "user")
     search_fields = ("comment", "product__name", "user__username")
+    autocomplete_fields = ("product", "user")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ProductView)
 class ProductViewAdmin(admin.ModelAdmin):
-    list_display = ("product", "user", "session_key", "ip", "created_at")
+    list_display = ("product", "user", "visitor_id", "ip", "created_at")
     list_select_related = ("product", "user")
-    date_hierarchy = "created_at"
-    search_fields = ("product__name", "user__username", "session_key", "ip")
-    readonly_fields = ("product", "user", "session_key", "ip", "created_at")
+    list_filter = (RecentPeriodFilter,)
+    search_fields = ("product__name", "user__username", "visitor_id", "ip")
+    readonly_fields = ("product", "user", "visitor_id", "ip", "created_at")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def has_add_permission(self, request: HttpRequest) -> bool:  # запрет ручного добавления
         return False
 
     def has_change_permission(self, request: HttpRequest, obj: Optional[ProductView] = None) -> bool:
         return False
+
+
+@admin.register(ProductViewDaily)
+class ProductViewDailyAdmin(admin.ModelAdmin):
+    list_display = ("product", "day", "views", "anon_views", "cm_views", "admin_views")
+    list_select_related = ("product",)
+    list_filter = ("day",)
+    search_fields = ("product__name",)
+    readonly_fields = ("product", "day", "views", "anon_views", "cm_views", "admin_views")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: Optional[ProductViewDaily] = None) -> bool:
+        return False
@@ -6,5 +6,6 @@ class ProductsConfig(AppConfig):
     name = "products"
     verbose_name = "Каталог"
 
-    def ready(self) -> None:  # для mypy
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
         return None
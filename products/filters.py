@@ -1,13 +1,25 @@
 import django_filters
+from django.db.models import QuerySet
 from .models import Product, Category
 
 
 class ProductFilter(django_filters.FilterSet):
     min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
     max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    # Верхняя граница ценовой корзины фасетов (facets._price_bucket_expr): не включительно
+    price_below = django_filters.NumberFilter(field_name="price", lookup_expr="lt")
     category = django_filters.ModelChoiceFilter(queryset=Category.objects.all())
     category_slug = django_filters.CharFilter(field_name="category__slug", lookup_expr="exact")
+    in_stock = django_filters.BooleanFilter(method="filter_in_stock")
+    min_rating = django_filters.NumberFilter(field_name="rating_avg", lookup_expr="gte")
 
     class Meta:
         model = Product
-        fields = ["category", "category_slug", "min_price", "max_price", "is_active"]
+        fields = [
+            "category", "category_slug", "min_price", "max_price", "price_below", "in_stock", "min_rating", "is_active",
+        ]
+
+    def filter_in_stock(self, queryset: QuerySet[Product], name: str, value: bool | None) -> QuerySet[Product]:
+        if value is None:
+            return queryset
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock=0)
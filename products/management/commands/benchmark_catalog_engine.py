@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from decimal import Decimal
+from typing import Any, Callable
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import QueryDict
+
+from products.filters import ProductFilter
+from products.models import Category, Product
+from products.services.catalog_engine import CatalogSnapshot, EngineResult, build_query
+from products.services.recommendations import load_numpy
+from products.views import order_products
+
+PAGE_SIZE = 12
+
+SCENARIOS = [
+    "",
+    "ordering=price",
+    "ordering=-price&page=50",
+    "ordering=popular&in_stock=true",
+    "min_price=1000&max_price=5000&ordering=new",
+    "min_rating=3&in_stock=true&ordering=price&page=3",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает список каталога через SQL и через колоночный снимок на синтетическом каталоге. "
+        "Товары создаются в транзакции, которая откатывается."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--products", type=int, default=100_000, help="Сколько синтетических товаров добавить")
+        parser.add_argument("--repeat", type=int, default=20, help="Повторов каждого сценария")
+
+    def handle(self, *args: Any, **opts: Any) -> None:
+        np = load_numpy()
+        if np is None:
+            raise CommandError("Для снимка каталога нужен numpy")
+        with transaction.atomic():
+            category_ids = self._populate(opts["products"])
+            started = time.perf_counter()
+            snapshot = CatalogSnapshot.load(np)
+            self.stdout.write(f"Снимок: {snapshot.size} товаров за {(time.perf_counter() - started) * 1000:.0f} мс")
+            scenarios = SCENARIOS + [f"category={category_ids[0]}&ordering=popular"]
+            self.stdout.write(f"{'SQL, мс':>10} {'снимок, мс':>11}  запрос")
+            for params in scenarios:
+                data = QueryDict(params)
+                sql = self._measure(lambda: self._sql_page(data), opts["repeat"])
+                engine = self._measure(lambda: self._engine_page(snapshot, data), opts["repeat"])
+                self.stdout.write(f"{sql:10.1f} {engine:11.1f}  ?{params}")
+            transaction.set_rollback(True)
+
+    def _populate(self, count: int) -> list[int]:
+        rnd = random.Random(42)
+        root = Category.objects.create(name="Бенчмарк", slug="benchmark-root")
+        categories = [Category.objects.create(name=f"Бенчмарк {i}", slug=f"benchmark-{i}", parent=root)
+                      for i in range(20)]
+        Product.objects.bulk_create(
+            (Product(
+                name=f"Товар {i}", slug=f"benchmark-product-{i}", category=rnd.choice(categories),
+                price=Decimal(rnd.randint(100, 10_000_000)) / 100, stock=rnd.choice((0, 0, 1, 5, 20)),
+                rating_avg=round(rnd.uniform(0, 5), 2), reviews_count=rnd.randint(0, 200),
+            ) for i in range(count)),
+            batch_size=5000,
+        )
+        return [c.pk for c in categories]
+
+    def _measure(self, fn: Callable[[], object], repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def _sql_page(self, data: QueryDict) -> list[Product]:
+        base = Product.objects.select_related("category").filter(is_active=True)
+        qs = order_products(ProductFilter(data, queryset=base).qs, data.get("ordering"))
+        return list(Paginator(qs, PAGE_SIZE).get_page(data.get("page")))
+
+    def _engine_page(self, snapshot: CatalogSnapshot, data: QueryDict) -> list[Product]:
+        query = build_query(data)
+        if query is None:
+            raise CommandError(f"Снимок не поддерживает запрос: {data.urlencode()}")
+        return list(Paginator(EngineResult(snapshot.query(query)), PAGE_SIZE).get_page(data.get("page")))
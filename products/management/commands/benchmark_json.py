@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import time
+from io import BytesIO
+from typing import Any, Callable
+
+from django.core.management.base import BaseCommand, CommandParser
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from config.fastjson import FastJSONParser, FastJSONRenderer, load_orjson
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from products.models import Product
+from products.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Скорость JSON на ответах /api/products/ и /api/orders/: стандартный JSONRenderer/JSONParser DRF "
+        "против config.fastjson (orjson). Данные сериализуются один раз, замеряется только кодирование/разбор."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--products", type=int, default=100, help="Товаров в ответе (страница каталога)")
+        parser.add_argument("--orders", type=int, default=50, help="Заказов с позициями в ответе")
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args: Any, **opts: Any) -> None:
+        if load_orjson() is None:
+            self.stdout.write(self.style.WARNING("orjson не установлен (или FAST_JSON=0): сравнивается json с json."))
+        payloads = {
+            "/api/products/": ProductSerializer(
+                Product.objects.select_related("category").order_by("pk")[:opts["products"]], many=True
+            ).data,
+            "/api/orders/": OrderSerializer(
+                Order.objects.prefetch_related("items__product").order_by("-pk")[:opts["orders"]], many=True
+            ).data,
+        }
+        for name, data in payloads.items():
+            body = JSONRenderer().render(data)
+            # Байты могут отличаться записью float (1e16 / 1e+16) — сравниваем содержимое
+            if json.loads(FastJSONRenderer().render(data)) != json.loads(body):
+                self.stdout.write(self.style.ERROR(f"{name}: вывод FastJSONRenderer отличается от JSONRenderer"))
+            self.stdout.write(f"{name}: {len(data)} объектов, {len(body) / 1024:.1f} КБ")
+            for label, std, fast in (
+                ("render", lambda: JSONRenderer().render(data), lambda: FastJSONRenderer().render(data)),
+                ("parse", lambda: JSONParser().parse(BytesIO(body)), lambda: FastJSONParser().parse(BytesIO(body))),
+            ):
+                std_time = self._measure(std, opts["repeat"])
+                fast_time = self._measure(fast, opts["repeat"])
+                self.stdout.write(
+                    f"  {label:>6}: json {self._rate(std_time, len(body))}, "
+                    f"fast {self._rate(fast_time, len(body))} — x{std_time / fast_time:.1f}"
+                )
+
+    @staticmethod
+    def _measure(fn: Callable[[], Any], repeat: int) -> float:
+        fn()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - started) / repeat
+
+    @staticmethod
+    def _rate(seconds: float, size: int) -> str:
+        return f"{seconds * 1e6:.0f} мкс ({size / seconds / 2**20:.0f} МБ/с)"
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import DatabaseError, connection, transaction
+
+from products.models import Category, Product
+from products.services.stock import available_stock, shard_stock, take_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Параллельные списания одного «горячего» товара: остаток в одной строке Product против шардов. "
+        "Создаёт временный товар и удаляет его после замера. Показательно на PostgreSQL: SQLite блокирует всю БД."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--workers", type=int, default=16, help="Параллельных «покупателей» (потоков)")
+        parser.add_argument("--orders", type=int, default=400, help="Заказов на каждый режим")
+        parser.add_argument("--shards", type=int, default=settings.STOCK_SHARDS)
+        parser.add_argument("--hold-ms", type=float, default=5.0,
+                            help="Сколько транзакция заказа держит остаток после списания (остальная работа заказа)")
+
+    def handle(self, *args: Any, **opts: Any) -> None:
+        if connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING("SQLite: запись блокирует всю базу, разницы между режимами не будет."))
+        category = Category.objects.order_by("pk").first() or Category.objects.create(
+            name="Бенчмарк", slug="benchmark-stock"
+        )
+        product = Product.objects.create(
+            name="Бенчмарк остатка", slug=f"benchmark-stock-{int(time.time())}", price=1,
+            category=category, stock=opts["orders"] * 2, is_active=False,
+        )
+        try:
+            for label, shards in (("одна строка", 0), (f"{opts['shards']} шардов", opts["shards"])):
+                shard_stock(product, shards)
+                before = available_stock([product])[product.pk]
+                done, failed, elapsed = self._run(product, opts["orders"], opts["workers"], opts["hold_ms"] / 1000)
+                after = available_stock([Product.objects.get(pk=product.pk)])[product.pk]
+                consistent = "ok" if before - after == done else f"РАСХОЖДЕНИЕ {before - after} != {done}"
+                self.stdout.write(
+                    f"{label:>14}: {done} заказов за {elapsed:.2f} с — {done / elapsed:.0f} заказов/с, "
+                    f"ошибок {failed}, остаток {consistent}"
+                )
+        finally:
+            product.delete()
+
+    def _run(self, product: Product, orders: int, workers: int, hold: float) -> tuple[int, int, float]:
+        tickets = itertools.count()
+        lock = threading.Lock()
+        done = failed = 0
+
+        def worker() -> None:
+            nonlocal done, failed
+            try:
+                while next(tickets) < orders:
+                    try:
+                        with transaction.atomic():
+                            ok = take_stock(product, 1)
+                            time.sleep(hold)
+                    except DatabaseError:
+                        ok = False
+                    with lock:
+                        done, failed = (done + 1, failed) if ok else (done, failed + 1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return done, failed, time.perf_counter() - started
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandParser
+
+
+class Command(BaseCommand):
+    help = "Собирает OpenAPI-схему в файл (по умолчанию OPENAPI_SCHEMA_FILE), который отдаёт /api/schema/."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--output", default=str(settings.OPENAPI_SCHEMA_FILE),
+                            help="Путь к файлу; расширение .json — JSON, иначе YAML")
+        parser.add_argument("--validate", action="store_true", help="Проверить схему по спецификации OpenAPI")
+
+    def handle(self, *args: Any, **opts: Any) -> None:
+        path = Path(opts["output"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fmt = "openapi-json" if path.suffix == ".json" else "openapi"
+        call_command("spectacular", file=str(path), format=fmt, validate=opts["validate"], fail_on_warn=False)
+        self.stdout.write(self.style.SUCCESS(f"Схема записана: {path} ({path.stat().st_size} байт)"))
@@ -0,0 +1,35 @@
+from __future__ import annotations
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+
+from products.services.recommendations import BuildOptions, load_numpy, build_related
+
+
+class Command(BaseCommand):
+    help = "Пересчитать «с этим товаром покупают» по совместным покупкам (и просмотрам в одной сессии)"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--full", action="store_true",
+                            help="Полный пересчёт (по умолчанию — только товары из новых заказов)")
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--views-weight", type=float, default=0.3,
+                            help="Вес совместного просмотра относительно совместной покупки (0 — не учитывать)")
+        parser.add_argument("--views-days", type=int, default=30)
+        parser.add_argument("--max-basket", type=int, default=50,
+                            help="Корзины/сессии крупнее пропускаются: они дают квадратичное число пар")
+        parser.add_argument("--no-numpy", action="store_true", help="Считать без NumPy")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        opts = BuildOptions(
+            top_k=options["top_k"],
+            views_weight=options["views_weight"],
+            views_days=options["views_days"],
+            max_basket=options["max_basket"],
+            use_numpy=not options["no_numpy"],
+        )
+        result = build_related(opts, full=options["full"])
+        engine = "numpy" if opts.use_numpy and load_numpy() is not None else "python"
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Полный' if result.full else 'Инкрементальный'} пересчёт ({engine}) до заказа #{result.last_order_id}: "
+            f"товаров {result.products_updated}, связей {result.pairs} за {result.elapsed:.2f} с"
+        ))
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import sys
+from typing import Any
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from products.services.catalog_io import (
+    CatalogImporter, CatalogImportError, ImportStats, detect_format, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Потоковый импорт каталога (CSV / JSON-lines) с пакетным upsert категорий и товаров"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", help="Путь к файлу или '-' для stdin")
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None,
+                            help="Формат файла (по умолчанию — по расширению)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Разобрать и проверить без записи в БД")
+        parser.add_argument("--max-errors", type=int, default=20, help="Сколько ошибок строк вывести")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path: str = options["path"]
+        fmt = detect_format(path, options["format"])
+        importer = CatalogImporter(batch_size=options["batch_size"], dry_run=options["dry_run"])
+
+        def progress(stats: ImportStats) -> None:
+            self.stdout.write(
+                f"{stats.rows} строк, товаров {stats.products}, категорий {stats.categories}, "
+                f"пропущено {stats.skipped} — {stats.rate:.0f} строк/с"
+            )
+
+        try:
+            if path == "-":
+                stats = importer.run(read_rows(sys.stdin, fmt), progress=progress)
+            else:
+                with open(path, encoding="utf-8", newline="") as fh:
+                    stats = importer.run(read_rows(fh, fmt), progress=progress)
+        except (OSError, CatalogImportError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for err in stats.errors[:options["max_errors"]]:
+            self.stderr.write(err)
+        if len(stats.errors) > options["max_errors"]:
+            self.stderr.write(f"... и ещё {len(stats.errors) - options['max_errors']} ошибок")
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово{' (dry-run)' if options['dry_run'] else ''}: {stats.rows} строк за {stats.elapsed:.1f} с "
+            f"({stats.rate:.0f} строк/с), товаров {stats.products}, пропущено {stats.skipped}"
+        ))
@@ -0,0 +1,31 @@
+from __future__ import annotations
+from typing import Any
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import DatabaseError
+
+from products.services import view_partitions
+
+
+class Command(BaseCommand):
+    help = "PostgreSQL: помесячное партиционирование таблицы просмотров товаров"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--convert", action="store_true",
+                            help="Перевести существующую таблицу на партиционирование (блокирует таблицу)")
+        parser.add_argument("--months-ahead", type=int, default=3,
+                            help="Сколько месяцев партиций создать заранее")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            if options["convert"]:
+                created = view_partitions.convert_to_partitioned(options["months_ahead"])
+                self.stdout.write(self.style.SUCCESS(f"Таблица переведена, партиций: {len(created)}"))
+            else:
+                created = view_partitions.ensure_partitions(options["months_ahead"])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Новых партиций: {len(created)}" + (f" ({', '.join(created)})" if created else "")
+                ))
+        except (view_partitions.PartitioningError, DatabaseError) as exc:
+            raise CommandError(str(exc)) from exc
+        for name, upper in view_partitions.list_partitions():
+            self.stdout.write(f"  {name}" + (f" < {upper:%Y-%m-%d}" if upper else " (default)"))
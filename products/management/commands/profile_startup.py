@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+# Строка вывода -X importtime: «import time: self [us] | cumulative | [отступ]модуль»
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+BOOT_SCRIPT = "import django; django.setup()"
+URLS_SCRIPT = BOOT_SCRIPT + "; from django.urls import get_resolver; get_resolver().url_patterns"
+
+
+class Command(BaseCommand):
+    help = "Профилирует время импорта при старте воркера (python -X importtime) и выводит самые тяжёлые модули."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--top", type=int, default=25, help="Сколько модулей показать")
+        parser.add_argument("--no-urls", action="store_true", help="Только django.setup(), без загрузки URLconf")
+        parser.add_argument("--self", action="store_true", dest="by_self",
+                            help="Сортировать по собственному времени модуля, а не накопленному")
+        parser.add_argument("--package", default="", help="Показывать только модули с этим префиксом")
+
+    def handle(self, *args: Any, **opts: Any) -> None:
+        script = BOOT_SCRIPT if opts["no_urls"] else URLS_SCRIPT
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "Запуск не удался")
+
+        rows: list[tuple[int, int, str]] = []
+        total = 0
+        for line in proc.stderr.splitlines():
+            m = IMPORTTIME_RE.match(line)
+            if not m:
+                continue
+            own, cumulative, indent, module = int(m[1]), int(m[2]), m[3], m[4]
+            # Модули верхнего уровня (минимальный отступ) в сумме дают всё время импорта
+            if len(indent) == 1:
+                total += cumulative
+            if module.startswith(opts["package"]):
+                rows.append((own, cumulative, module))
+
+        rows.sort(key=lambda r: r[0] if opts["by_self"] else r[1], reverse=True)
+        self.stdout.write(f"Импортировано модулей: {len(rows)}, суммарно {total / 1000:.1f} мс")
+        self.stdout.write(f"{'собств., мс':>12} {'накопл., мс':>12}  модуль")
+        for own, cumulative, module in rows[:opts["top"]]:
+            self.stdout.write(f"{own / 1000:12.1f} {cumulative / 1000:12.1f}  {module}")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+from typing import Any
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from products.services import view_partitions
+from products.services.view_retention import RollupStats, rollup_views
+
+
+class Command(BaseCommand):
+    help = "Свернуть сырые просмотры товаров старше N дней в суточные агрегаты и удалить их пачками"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--days", type=int, default=settings.PRODUCT_VIEWS_RETENTION_DAYS,
+                            help="Сколько дней хранить сырые просмотры")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="Ограничить число пачек за запуск")
+        parser.add_argument("--months-ahead", type=int, default=3,
+                            help="PostgreSQL: сколько месяцев партиций создавать заранее")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        def progress(stats: RollupStats) -> None:
+            self.stdout.write(f"пачка {stats.batches}: удалено {stats.raw_deleted}, "
+                              f"агрегатов +{stats.daily_created} / ~{stats.daily_updated}")
+
+        stats = rollup_views(
+            options["days"], batch_size=options["batch_size"],
+            max_batches=options["max_batches"], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Свёрнуто просмотров до {stats.cutoff:%Y-%m-%d}: {stats.raw_deleted} за {stats.elapsed:.1f} с"
+        ))
+
+        if view_partitions.is_partitioned():
+            created = view_partitions.ensure_partitions(options["months_ahead"])
+            dropped = view_partitions.drop_empty_partitions(stats.cutoff)
+            if created:
+                self.stdout.write(f"Созданы партиции: {', '.join(created)}")
+            if dropped:
+                self.stdout.write(f"Удалены пустые партиции: {', '.join(dropped)}")
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from products.services.cache_warming import WarmResult, WarmStats, warm, warming_urls
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогреть кэши каталога после деплоя или большого импорта: главная, сортировки каталога "
+        "и популярных категорий, карточки популярных товаров и API — по свежим просмотрам"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--days", type=int, default=7, help="За сколько дней брать просмотры")
+        parser.add_argument("--categories", type=int, default=10, help="Сколько популярных категорий")
+        parser.add_argument("--products", type=int, default=50, help="Сколько популярных товаров")
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--host", default=None, help="Host запросов (по умолчанию — из ALLOWED_HOSTS)")
+        parser.add_argument("--verify", action="store_true",
+                            help="Повторить запросы после прогрева и сравнить время ответа")
+        parser.add_argument("--list", action="store_true", help="Только вывести адреса")
+
+    def handle(self, *args: Any, **opts: Any) -> None:
+        urls = warming_urls(opts["days"], opts["categories"], opts["products"])
+        if opts["list"]:
+            self.stdout.write("\n".join(urls))
+            return
+        if settings.CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+            self.stdout.write(self.style.WARNING(
+                "Кэш в памяти процесса (нет REDIS_URL): прогрев не виден воркерам сервера."
+            ))
+
+        def progress(result: WarmResult) -> None:
+            if opts["verbosity"] > 1:
+                self.stdout.write(f"{result.status} {result.seconds * 1000:6.0f} мс {result.url}")
+
+        stats = warm(urls, threads=opts["threads"], host=opts["host"], progress=progress)
+        self._report("Прогрев", stats)
+        for result in stats.failed:
+            self.stdout.write(self.style.ERROR(f"{result.status} {result.url}"))
+        for result in sorted(stats.results, key=lambda r: r.seconds, reverse=True)[:5]:
+            self.stdout.write(f"  медленно: {result.seconds * 1000:.0f} мс {result.url}")
+        if opts["verify"]:
+            self._report("Повторно", warm(urls, threads=opts["threads"], host=opts["host"]))
+        message = f"Кэш прогрет за {stats.elapsed:.1f} с ({len(stats.results)} адресов)"
+        self.stdout.write(self.style.SUCCESS(message) if not stats.failed else self.style.WARNING(message))
+
+    def _report(self, label: str, stats: WarmStats) -> None:
+        times = sorted(r.seconds for r in stats.results)
+        if not times:
+            return
+        p50, p95 = times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.95))]
+        self.stdout.write(
+            f"{label}: {len(times)} запросов за {stats.elapsed:.2f} с, ошибок {len(stats.failed)}, "
+            f"p50 {p50 * 1000:.0f} мс, p95 {p95 * 1000:.0f} мс, сумма {sum(times):.2f} с"
+        )
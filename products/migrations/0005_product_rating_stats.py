@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:38
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def fill_rating_stats(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+    stats = Review.objects.values("product_id").annotate(avg=Avg("rating"), cnt=Count("id")).order_by()
+    for row in stats.iterator():
+        Product.objects.filter(pk=row["product_id"]).update(
+            rating_avg=round(float(row["avg"] or 0.0), 2), reviews_count=row["cnt"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_rename_products_pr_product_7c3be4_idx_products_pr_product_e6f684_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(default=0.0, verbose_name='Средний рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов'),
+        ),
+        migrations.RunPython(fill_rating_stats, migrations.RunPython.noop),
+    ]
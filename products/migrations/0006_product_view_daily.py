@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_rating_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('anon_views', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Просмотры товара за день',
+                'verbose_name_plural': 'Просмотры товаров по дням',
+                'indexes': [models.Index(fields=['day'], name='products_pr_day_defc81_idx')],
+                'unique_together': {('product', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_view_daily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProductsBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_id', models.BigIntegerField(default=0)),
+                ('full', models.BooleanField(default=False)),
+                ('products_updated', models.PositiveIntegerField(default=0)),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Пересчёт связанных товаров',
+                'verbose_name_plural': 'Пересчёты связанных товаров',
+                'ordering': ['-built_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductRelation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relations', to='products.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Связанный товар',
+                'verbose_name_plural': 'Связанные товары',
+                'indexes': [models.Index(fields=['product', 'rank'], name='products_pr_product_49e9f0_idx')],
+                'unique_together': {('product', 'related')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:46
+
+import products.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_rating_histogram(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+    histograms = {}
+    rows = Review.objects.values_list("product_id", "rating").annotate(cnt=Count("id")).order_by()
+    for product_id, rating, cnt in rows.iterator():
+        histograms.setdefault(product_id, [0, 0, 0, 0, 0])[rating - 1] = cnt
+    for product_id, histogram in histograms.items():
+        Product.objects.filter(pk=product_id).update(rating_histogram=histogram)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_related_products'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Отзыв', 'verbose_name_plural': 'Отзывы'},
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_histogram',
+            field=models.JSONField(default=products.models.empty_rating_histogram, verbose_name='Распределение оценок'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='products_re_product_56c63e_idx'),
+        ),
+        migrations.RunPython(fill_rating_histogram, migrations.RunPython.noop),
+    ]
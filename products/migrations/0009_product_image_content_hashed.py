@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:05
+
+import products.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=products.models.ContentHashedImageField(blank=True, null=True, upload_to='products/'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_image_content_hashed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productview',
+            name='products_pr_session_5a3656_idx',
+        ),
+        migrations.RenameField(
+            model_name='productview',
+            old_name='session_key',
+            new_name='visitor_id',
+        ),
+        migrations.AddIndex(
+            model_name='productview',
+            index=models.Index(fields=['visitor_id'], name='products_pr_visitor_d577ca_idx'),
+        ),
+    ]
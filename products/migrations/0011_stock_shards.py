@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:08
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_view_visitor_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_shards',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Шардов остатка'),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('quantity', models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)])),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Шард остатка',
+                'verbose_name_plural': 'Шарды остатка',
+                'unique_together': {('product', 'shard')},
+            },
+        ),
+    ]
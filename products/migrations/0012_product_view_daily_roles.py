@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_stock_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productviewdaily',
+            name='admin_views',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productviewdaily',
+            name='cm_views',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
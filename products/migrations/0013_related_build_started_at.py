@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_view_daily_roles'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='relatedproductsbuild',
+            name='built_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import hashlib
+import os
 from decimal import Decimal
+from typing import Any, Collection, Iterable, Optional
 from django.conf import settings
+from django.core.files import File
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.fields.files import ImageFieldFile
 from django.urls import reverse
+from django.utils import timezone
 
 
 class TimeStampedModel(models.Model):
@@ -15,6 +21,25 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
+def empty_rating_histogram() -> list[int]:
+    # Кол-во отзывов с оценками 1..5
+    return [0, 0, 0, 0, 0]
+
+
+class ContentHashedImageFieldFile(ImageFieldFile):
+    def save(self, name: str, content: File, save: bool = True) -> None:
+        # Хэш содержимого в имени: новый файл — новый URL, поэтому медиа кэшируется как immutable
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        stem, ext = os.path.splitext(os.path.basename(name))
+        super().save(f"{stem}.{digest.hexdigest()[:16]}{ext.lower()}", content, save)
+
+
+class ContentHashedImageField(models.ImageField):
+    attr_class = ContentHashedImageFieldFile
+
+
 class Category(TimeStampedModel):
     name = models.CharField(max_length=255)
     slug = models.SlugField(unique=True)
@@ -34,10 +59,20 @@ class Product(TimeStampedModel):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal("0.00"))])
     category = models.ForeignKey(Category, related_name="products", on_delete=models.PROTECT)
-    image = models.ImageField(upload_to="products/", blank=True, null=True)
+    image = ContentHashedImageField(upload_to="products/", blank=True, null=True)
     is_active = models.BooleanField(default=True)
     stock = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    # >0 — остаток горячего товара разбит на столько строк StockShard (products.services.stock),
+    # а stock — их сумма после коммита последнего списания (для витрины, не для списания)
+    stock_shards = models.PositiveSmallIntegerField("Шардов остатка", default=0)
     view_count = models.PositiveIntegerField(default=0)
+    # Денормализованные агрегаты отзывов, пересчитываются в recalc_rating()
+    rating_avg = models.FloatField("Средний рейтинг", default=0.0)
+    reviews_count = models.PositiveIntegerField("Отзывов", default=0)
+    rating_histogram = models.JSONField("Распределение оценок", default=empty_rating_histogram)
+
+    # Значения полей на момент загрузки из БД (attname -> значение), см. changed_fields
+    _loaded: Optional[dict[str, Any]] = None
 
     class Meta:
         ordering = ["-created_at"]
@@ -47,32 +82,165 @@ class Product(TimeStampedModel):
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def from_db(cls, db: Optional[str], field_names: Collection[str], values: Collection[Any]) -> Product:
+        instance = super().from_db(db, field_names, values)
+        # Отложенных полей (only/defer) в __dict__ нет — их не запоминаем
+        instance._loaded = {
+            f.attname: instance.__dict__[f.attname] for f in cls._meta.concrete_fields if f.attname in instance.__dict__
+        }
+        return instance
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        names = {f.attname for f in self._meta.concrete_fields if f.attname in self.__dict__}
+        if update_fields is not None and self._loaded is not None:
+            names &= self._attnames(update_fields)
+        self._loaded = {**(self._loaded or {}), **{name: self.__dict__[name] for name in names}}
+
+    def _attnames(self, names: Iterable[str]) -> set[str]:
+        """update_fields допускает и name, и attname ("category" / "category_id")."""
+        by_name = {f.name: f.attname for f in self._meta.concrete_fields}
+        return {by_name.get(name, name) for name in names}
+
+    def changed_fields(self, names: Iterable[str], update_fields: Optional[Iterable[str]] = None) -> set[str]:
+        """
+        Какие из полей (attname) изменились с загрузки из БД — для сигналов post_save, до конца save().
+        У нового объекта — все; с update_fields — только среди сохраняемых.
+        """
+        names = set(names)
+        if update_fields is not None:
+            names &= self._attnames(update_fields)
+        if self._loaded is None:
+            return names
+        current = self.__dict__
+        return {
+            name for name in names
+            if name in current and (name not in self._loaded or current[name] != self._loaded[name])
+        }
+
     def get_absolute_url(self) -> str:
         return reverse("products:product_detail", kwargs={"slug": self.slug})
 
     @property
     def average_rating(self) -> float:
-        agg = self.reviews.aggregate(avg=models.Avg("rating"))
-        return float(agg["avg"] or 0.0)
+        return self.rating_avg
+
+    @property
+    def rating_distribution(self) -> list[dict[str, int]]:
+        """Строки гистограммы от 5 до 1 звезды: оценка, кол-во, доля в процентах."""
+        total = sum(self.rating_histogram) or 1
+        rows = []
+        for rating in range(5, 0, -1):
+            count = self.rating_histogram[rating - 1]
+            rows.append({"rating": rating, "count": count, "percent": round(100 * count / total)})
+        return rows
+
+    def recalc_rating(self) -> None:
+        histogram = empty_rating_histogram()
+        for rating, cnt in self.reviews.values_list("rating").annotate(cnt=models.Count("id")).order_by():
+            histogram[rating - 1] = cnt
+        total = sum(histogram)
+        self.rating_histogram = histogram
+        self.reviews_count = total
+        self.rating_avg = round(sum(r * c for r, c in enumerate(histogram, start=1)) / total, 2) if total else 0.0
+        Product.objects.filter(pk=self.pk).update(
+            rating_avg=self.rating_avg, reviews_count=self.reviews_count, rating_histogram=histogram
+        )
+
+
+class StockShard(models.Model):
+    """Часть остатка товара: параллельные списания расходятся по разным строкам вместо одной строки Product."""
+
+    product = models.ForeignKey(Product, related_name="shards", on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+
+    class Meta:
+        unique_together = ("product", "shard")
+        verbose_name = "Шард остатка"
+        verbose_name_plural = "Шарды остатка"
+
+    def __str__(self) -> str:
+        return f"{self.product_id}#{self.shard}: {self.quantity}"
 
 
 class ProductView(models.Model):
     product = models.ForeignKey(Product, related_name="views", on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
-    session_key = models.CharField(max_length=40, blank=True, default="")
+    # id анонимного посетителя из подписанной cookie (старые записи — ключ сессии)
+    visitor_id = models.CharField(max_length=40, blank=True, default="")
     ip = models.GenericIPAddressField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["product", "created_at"]),
-            models.Index(fields=["session_key"]),
+            models.Index(fields=["visitor_id"]),
         ]
         verbose_name = "Просмотр товара"
         verbose_name_plural = "Просмотры товара"
 
     def __str__(self) -> str:
-        return f"View {self.product} by {self.user or self.session_key} @ {self.created_at}"
+        return f"View {self.product} by {self.user or self.visitor_id} @ {self.created_at}"
+
+
+class ProductViewDaily(models.Model):
+    """Суточный агрегат просмотров: сюда сворачиваются сырые ProductView старше срока хранения."""
+
+    product = models.ForeignKey(Product, related_name="daily_views", on_delete=models.CASCADE)
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    anon_views = models.PositiveIntegerField(default=0)
+    # Разбивка по ролям на момент свёртки — как в аналитике по сырым просмотрам
+    cm_views = models.PositiveIntegerField(default=0)
+    admin_views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("product", "day")
+        indexes = [models.Index(fields=["day"])]
+        verbose_name = "Просмотры товара за день"
+        verbose_name_plural = "Просмотры товаров по дням"
+
+    def __str__(self) -> str:
+        return f"{self.product} @ {self.day}: {self.views}"
+
+
+class ProductRelation(models.Model):
+    """Предрасчитанные «с этим товаром покупают»: top-K соседей товара по совместным покупкам/просмотрам."""
+
+    product = models.ForeignKey(Product, related_name="relations", on_delete=models.CASCADE)
+    related = models.ForeignKey(Product, related_name="+", on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ("product", "related")
+        indexes = [models.Index(fields=["product", "rank"])]
+        verbose_name = "Связанный товар"
+        verbose_name_plural = "Связанные товары"
+
+    def __str__(self) -> str:
+        return f"{self.product_id} -> {self.related_id} ({self.score:.2f})"
+
+
+class RelatedProductsBuild(models.Model):
+    """Водяной знак инкрементального пересчёта: до какого заказа учтены совместные покупки."""
+
+    last_order_id = models.BigIntegerField(default=0)
+    full = models.BooleanField(default=False)
+    products_updated = models.PositiveIntegerField(default=0)
+    # Момент начала расчёта: заказы, изменённые во время него, попадут в следующий
+    built_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-built_at"]
+        verbose_name = "Пересчёт связанных товаров"
+        verbose_name_plural = "Пересчёты связанных товаров"
+
+    def __str__(self) -> str:
+        return f"{self.built_at:%Y-%m-%d %H:%M} до заказа #{self.last_order_id}"
 
 
 class Review(TimeStampedModel):
@@ -83,7 +251,9 @@ class Review(TimeStampedModel):
 
     class Meta:
         unique_together = ("product", "user")
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        # Keyset-пагинация отзывов товара: (created_at, id) по убыванию
+        indexes = [models.Index(fields=["product", "-created_at", "-id"])]
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
 
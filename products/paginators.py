@@ -0,0 +1,57 @@
+from __future__ import annotations
+import json
+from typing import Optional
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц: вместо точного COUNT(*) берёт оценку планировщика PostgreSQL
+    (pg_class.reltuples для таблицы без фильтров, EXPLAIN — для отфильтрованного queryset).
+    Если оценка небольшая или БД не PostgreSQL — считает честно.
+    """
+
+    exact_count_threshold = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        estimate = self.estimate_count()
+        if estimate is not None and estimate > self.exact_count_threshold:
+            return estimate
+        return super().count
+
+    def estimate_count(self) -> Optional[int]:
+        qs = self.object_list
+        if not isinstance(qs, QuerySet):
+            return None
+        connection = connections[qs.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            if not qs.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                    [qs.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                # reltuples = -1/0 у ещё не проанализированной таблицы
+                return int(row[0]) if row and row[0] > 0 else None
+            sql, params = qs.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class ReviewCursorPagination(CursorPagination):
+    """Отзывы в API: курсор по (created_at, id), стабилен при добавлении новых отзывов."""
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    ordering = ("-created_at", "-id")
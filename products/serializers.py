@@ -28,7 +28,8 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             "id", "name", "slug", "description", "price", "category",
-            "image", "is_active", "stock", "created_at", "updated_at", "average_rating"
+            "image", "is_active", "stock", "created_at", "updated_at", "average_rating",
+            "reviews_count", "rating_histogram"
         ]
 
 
@@ -40,15 +41,14 @@ class ProductCreateReviewSerializer(serializers.ModelSerializer):
     def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
         request = self.context["request"]
         product: Product = self.context["product"]
-        from orders.models import Order
+        from orders.services.purchases import has_purchased
         user = cast(User, request.user)
         # permission IsAuthenticated гарантирует user.is_authenticated
-        has_bought = Order.objects.filter(user=user, items__product=product).exclude(status="cancelled").exists()
-        if not has_bought:
+        if not has_purchased(user, product.pk):
             raise serializers.ValidationError("Вы можете оставить отзыв только после покупки товара.")
         return attrs
 
     def create(self, validated_data: dict[str, Any]) -> Review:
         product: Product = self.context["product"]
-        user: User = self.context["request"].user
-        return Review.objects.create(product=product, user=user, **validated_data)
+        user = self.context["request"].user
+        return Review.objects.create(product=product, user_id=user.pk, **validated_data)
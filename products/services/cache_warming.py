@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from products.models import Category, Product, ProductView
+
+# «bot» в User-Agent: прогрев не пишет просмотры и не выдаёт cookie посетителя (view_dedup.BOT_UA_RE)
+WARMER_USER_AGENT = "CacheWarmer/1.0 (bot)"
+# Сортировки списка товаров (products.views.order_products) и API каталога
+LIST_ORDERINGS = ("", "price", "-price", "new", "popular")
+API_ORDERINGS = ("", "price", "-price", "-created_at")
+
+
+@dataclass
+class WarmResult:
+    url: str
+    status: int
+    seconds: float
+
+
+@dataclass
+class WarmStats:
+    results: list[WarmResult] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def failed(self) -> list[WarmResult]:
+        return [r for r in self.results if not 200 <= r.status < 400]
+
+
+def warming_urls(days: int = 7, categories: int = 10, products: int = 50) -> list[str]:
+    """
+    Что прогревать, по просмотрам за последние `days` дней (без них — по накопленному view_count):
+    главная, первые страницы каталога и самых просматриваемых категорий во всех сортировках,
+    карточки самых просматриваемых товаров, API каталога. Самое востребованное — первым.
+    """
+    recent = ProductView.objects.filter(created_at__gte=timezone.now() - timedelta(days=days),
+                                        product__is_active=True)
+    product_ids = list(
+        recent.values("product_id").annotate(c=Count("id")).order_by("-c").values_list("product_id", flat=True)
+        [:products]
+    )
+    category_ids = list(
+        recent.values("product__category_id").annotate(c=Count("id")).order_by("-c")
+        .values_list("product__category_id", flat=True)[:categories]
+    )
+    active = Product.objects.filter(is_active=True)
+    if not product_ids:
+        product_ids = list(active.order_by("-view_count").values_list("pk", flat=True)[:products])
+    if not category_ids:
+        category_ids = list(
+            active.values("category_id").annotate(v=Sum("view_count")).order_by("-v")
+            .values_list("category_id", flat=True)[:categories]
+        )
+
+    category_slugs = Category.objects.in_bulk(category_ids)
+    listings = [reverse("products:product_list")] + [
+        reverse("products:category_detail", args=[category_slugs[pk].slug]) for pk in category_ids
+        if pk in category_slugs
+    ]
+    product_urls = Product.objects.only("slug").in_bulk(product_ids)
+    return [
+        reverse("home"),
+        reverse("products:category_list"),
+        *(f"{url}?ordering={o}" if o else url for url in listings for o in LIST_ORDERINGS),
+        *(product_urls[pk].get_absolute_url() for pk in product_ids if pk in product_urls),
+        *(f"/api/products/?ordering={o}" if o else "/api/products/" for o in API_ORDERINGS),
+        "/api/categories/",
+    ]
+
+
+def warming_host() -> str:
+    """Host для запросов тестового клиента: первый явный из ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "testserver"
+
+
+def warm(
+    urls: list[str],
+    threads: int = 8,
+    host: Optional[str] = None,
+    progress: Optional[Callable[[WarmResult], None]] = None,
+) -> WarmStats:
+    """
+    Запрашивает urls тестовым клиентом Django в `threads` потоков (у каждого свой клиент и соединение с БД):
+    ответы проходят весь стек — view, шаблоны и кэши (фрагменты, фасеты), как у обычного посетителя.
+    """
+    stats = WarmStats()
+    tickets = itertools.count()
+    lock = threading.Lock()
+
+    def worker() -> None:
+        # Ошибка view — ответ 500 в статистике, а не падение потока
+        client = Client(HTTP_USER_AGENT=WARMER_USER_AGENT, HTTP_HOST=host or warming_host(),
+                        raise_request_exception=False)
+        try:
+            while (i := next(tickets)) < len(urls):
+                started = time.perf_counter()
+                status = client.get(urls[i]).status_code
+                result = WarmResult(urls[i], status, time.perf_counter() - started)
+                with lock:
+                    stats.results.append(result)
+                    if progress:
+                        progress(result)
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=worker) for _ in range(max(1, threads))]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    stats.finished = time.monotonic()
+    return stats
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Optional, Sequence, overload
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+
+from config.counters import incr_counter
+from products.filters import ProductFilter
+from products.models import Product
+from products.services.facets import category_tree
+from products.services.recommendations import load_numpy
+
+VERSION_CACHE_KEY = "catalog:engine:version"
+# Колонки Product в снимке (в порядке массивов ARRAYS); при их изменении или is_active снимок обновляется
+SNAPSHOT_COLUMNS = ("id", "category_id", "price", "created_at", "reviews_count", "stock", "rating_avg")
+TRACKED_FIELDS = ("is_active", *SNAPSHOT_COLUMNS)
+ARRAYS = ("ids", "category", "price", "created", "popularity", "stock", "rating")
+
+
+@dataclass
+class EngineQuery:
+    """То же, что ProductFilter + order_products, в виде, понятном снимку."""
+
+    category_ids: Optional[list[int]] = None
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    price_below: Optional[Decimal] = None
+    in_stock: Optional[bool] = None
+    min_rating: Optional[float] = None
+    ordering: Optional[str] = None
+
+
+def _intersect(a: Optional[list[int]], b: list[int]) -> list[int]:
+    if a is None:
+        return b
+    keep = set(b)
+    return [pk for pk in a if pk in keep]
+
+
+def build_query(data: QueryDict, category_ids: Optional[list[int]] = None) -> Optional[EngineQuery]:
+    """
+    Переводит GET-параметры каталога в EngineQuery. None — запрос снимку не по силам
+    (полнотекстовый q, невалидные параметры): тогда view идёт обычным SQL-путём.
+    """
+    if data.get("q"):
+        return None
+    form = ProductFilter(data, queryset=Product.objects.none()).form
+    if not form.is_valid():
+        return None
+    cleaned = form.cleaned_data
+    if cleaned.get("is_active") is False:
+        category_ids = []  # в снимке только активные товары
+    if cleaned.get("category") is not None:
+        category_ids = _intersect(category_ids, [cleaned["category"].pk])
+    if cleaned.get("category_slug"):
+        slug = cleaned["category_slug"]
+        category_ids = _intersect(category_ids, [pk for pk, (_, _, s) in category_tree().items() if s == slug])
+    min_rating = cleaned.get("min_rating")
+    return EngineQuery(
+        category_ids=category_ids,
+        min_price=cleaned.get("min_price"),
+        max_price=cleaned.get("max_price"),
+        price_below=cleaned.get("price_below"),
+        in_stock=cleaned.get("in_stock"),
+        min_rating=float(min_rating) if min_rating is not None else None,
+        ordering=data.get("ordering"),
+    )
+
+
+class CatalogSnapshot:
+    """
+    Колоночный снимок активных товаров: по массиву NumPy на поле. Фильтры — векторные маски,
+    сортировка — lexsort; наружу отдаются только id, товары страницы догружаются одним in_bulk.
+    """
+
+    def __init__(self, np: Any, rows: list[tuple[Any, ...]]) -> None:
+        self.np = np
+        self.size = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 7
+        self.ids = np.fromiter(columns[0], dtype=np.int64, count=self.size)
+        self.category = np.fromiter(columns[1], dtype=np.int64, count=self.size)
+        # Цена в копейках — сравнение без ошибок округления float
+        self.price = np.fromiter((int(p * 100) for p in columns[2]), dtype=np.int64, count=self.size)
+        self.created = np.fromiter((c.timestamp() for c in columns[3]), dtype=np.float64, count=self.size)
+        self.popularity = np.fromiter(columns[4], dtype=np.int64, count=self.size)
+        self.stock = np.fromiter(columns[5], dtype=np.int64, count=self.size)
+        self.rating = np.fromiter(columns[6], dtype=np.float64, count=self.size)
+
+    @classmethod
+    def load(cls, np: Any) -> CatalogSnapshot:
+        rows = list(
+            Product.objects.filter(is_active=True)
+            .values_list(*SNAPSHOT_COLUMNS)
+            .order_by()
+            .iterator(chunk_size=5000)
+        )
+        return cls(np, rows)
+
+    def replaced(self, product_id: int, row: Optional[tuple[Any, ...]]) -> CatalogSnapshot:
+        """
+        Копия снимка, где строка товара заменена на row (None — убрана). Сам снимок не меняется:
+        его в это время могут читать другие потоки. Порядок строк не важен — сортировка всегда с id.
+        """
+        np = self.np
+        patch = CatalogSnapshot(np, [row] if row is not None else [])
+        keep = self.ids != product_id
+        new = copy.copy(self)
+        for name in ARRAYS:
+            setattr(new, name, np.concatenate([getattr(self, name)[keep], getattr(patch, name)]))
+        new.size = len(new.ids)
+        return new
+
+    def with_values(self, product_id: int, **values: Any) -> CatalogSnapshot:
+        """Копия снимка с новыми значениями колонок (имена из ARRAYS) в строке товара."""
+        hit = self.ids == product_id
+        if not hit.any():
+            return self
+        new = copy.copy(self)
+        for name, value in values.items():
+            column = getattr(self, name).copy()
+            column[hit] = value
+            setattr(new, name, column)
+        return new
+
+    def query(self, q: EngineQuery) -> Any:
+        """Отсортированный массив id, подходящих под запрос."""
+        np = self.np
+        mask = np.ones(self.size, dtype=bool)
+        if q.category_ids is not None:
+            mask &= np.isin(self.category, np.asarray(q.category_ids, dtype=np.int64))
+        if q.min_price is not None:
+            mask &= self.price >= int(q.min_price * 100)
+        if q.max_price is not None:
+            mask &= self.price <= int(q.max_price * 100)
+        if q.price_below is not None:
+            mask &= self.price < int(q.price_below * 100)
+        if q.in_stock is not None:
+            mask &= (self.stock > 0) if q.in_stock else (self.stock == 0)
+        if q.min_rating is not None:
+            mask &= self.rating >= q.min_rating
+        idx = np.flatnonzero(mask)
+        # lexsort: последний ключ — главный; id — для стабильного порядка при равенстве
+        if q.ordering == "price":
+            order = np.lexsort((self.ids[idx], self.price[idx]))
+        elif q.ordering == "-price":
+            order = np.lexsort((-self.ids[idx], -self.price[idx]))
+        elif q.ordering == "popular":
+            order = np.lexsort((-self.ids[idx], -self.popularity[idx]))
+        else:  # "new" и порядок модели по умолчанию (-created_at)
+            order = np.lexsort((-self.ids[idx], -self.created[idx]))
+        return self.ids[idx[order]]
+
+
+class EngineResult(Sequence[Product]):
+    """
+    Результат для Paginator: длина известна без COUNT, срез догружает товары
+    страницы одним запросом и сохраняет порядок снимка.
+    """
+
+    def __init__(self, ids: Any) -> None:
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @overload
+    def __getitem__(self, index: int) -> Product: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Product]: ...
+
+    def __getitem__(self, index: int | slice) -> Product | list[Product]:
+        if isinstance(index, int):
+            return self[index:index + 1][0]
+        page_ids = self.ids[index].tolist()
+        products = Product.objects.select_related("category").in_bulk(page_ids)
+        # Товар мог быть удалён/скрыт после построения снимка — пропускаем
+        return [products[pk] for pk in page_ids if pk in products]
+
+
+class CatalogEngine:
+    """
+    Снимок в памяти процесса. Как у подсказок (suggest.SuggestService): изменение колонок снимка
+    у товара правит строку в снимке этого процесса и увеличивает версию в кэше, остальные процессы
+    перестраивают снимок при следующем запросе. Рейтинг после отзыва и остаток после заказа
+    правятся только в своём процессе, без версии (кроме закончившегося товара): поток отзывов
+    и заказов не должен перестраивать снимки всех воркеров, а у остальных значения догоняют
+    при плановой перестройке — не реже раза в CATALOG_ENGINE["MAX_AGE"] секунд.
+    """
+
+    def __init__(self) -> None:
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self.version: Any = None
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        conf: dict[str, Any] = settings.CATALOG_ENGINE
+        return bool(conf["ENABLED"]) and load_numpy() is not None
+
+    def get_snapshot(self) -> CatalogSnapshot:
+        conf: dict[str, Any] = settings.CATALOG_ENGINE
+        version = cache.get(VERSION_CACHE_KEY)
+        stale = time.monotonic() - self.built_at > conf["MAX_AGE"]
+        if self.snapshot is None or version != self.version or stale:
+            with self.lock:
+                if self.snapshot is None or version != self.version or stale:
+                    self.snapshot = CatalogSnapshot.load(load_numpy())
+                    self.version = version
+                    self.built_at = time.monotonic()
+        return self.snapshot
+
+    def search(self, q: EngineQuery) -> EngineResult:
+        return EngineResult(self.get_snapshot().query(q))
+
+    def _bump_version(self) -> None:
+        version = incr_counter(VERSION_CACHE_KEY)
+        # Свой снимок уже актуален — перестраивать его из-за своей же версии незачем
+        if version == (self.version or 0) + 1:
+            self.version = version
+        else:
+            self.snapshot = None
+
+    def product_changed(self, product_id: int) -> None:
+        with self.lock:
+            if self.snapshot is not None:
+                row = Product.objects.filter(pk=product_id, is_active=True).values_list(*SNAPSHOT_COLUMNS).first()
+                self.snapshot = self.snapshot.replaced(product_id, row)
+        self._bump_version()
+
+    def product_deleted(self, product_id: int) -> None:
+        with self.lock:
+            if self.snapshot is not None:
+                self.snapshot = self.snapshot.replaced(product_id, None)
+        self._bump_version()
+
+    def rating_changed(self, product_id: int, rating_avg: float, reviews_count: int) -> None:
+        with self.lock:
+            if self.snapshot is not None:
+                self.snapshot = self.snapshot.with_values(product_id, rating=rating_avg, popularity=reviews_count)
+
+    def stock_changed(self, product_id: int, stock: int) -> None:
+        """
+        Списание по заказу: остаток правится в своём снимке. Версия поднимается, только если товар
+        кончился — фасет «в наличии» должен измениться у всех; иначе каждый заказ перестраивал бы
+        снимки всех воркеров.
+        """
+        with self.lock:
+            if self.snapshot is not None:
+                self.snapshot = self.snapshot.with_values(product_id, stock=stock)
+        if stock <= 0:
+            self._bump_version()
+
+    def invalidate(self) -> None:
+        """Для массовых изменений без сигналов (импорт каталога): все процессы перестроят снимок."""
+        self.snapshot = None
+        self._bump_version()
+
+
+catalog_engine = CatalogEngine()
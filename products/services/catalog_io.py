@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any, Callable, Iterable, Iterator, Optional
+
+from django.db import transaction
+
+from config.keyset import iter_keyset
+from products.models import Category, Product
+from products.services.catalog_engine import catalog_engine
+from products.services.facets import invalidate_category_tree
+from products.services.stock import set_stock
+from products.services.suggest import suggest_service
+
+# Колонки файла каталога (CSV-заголовок / ключи JSON-lines)
+CATALOG_FIELDS = [
+    "slug", "name", "description", "price", "stock", "is_active",
+    "category_slug", "category_name", "category_parent_slug",
+]
+
+PRODUCT_UPDATE_FIELDS = ["name", "description", "price", "stock", "is_active", "category", "updated_at"]
+
+TRUE_VALUES = {"1", "true", "yes", "y", "on", "да"}
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    products: int = 0
+    categories: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[dict[str, Any]]:
+    """Лениво читает строки файла каталога, не загружая его в память целиком."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for lineno, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise CatalogImportError(f"строка {lineno}: некорректный JSON ({exc})") from exc
+
+
+def batched(rows: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _clean(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _parse_bool(value: Any, default: bool = True) -> bool:
+    raw = _clean(value).lower()
+    if not raw:
+        return default
+    return raw in TRUE_VALUES
+
+
+class CatalogImporter:
+    """
+    Пакетный upsert категорий и товаров по slug.
+    Слаги категорий резолвятся через словарь в памяти, который заполняется
+    один раз при старте и дополняется по мере создания новых категорий.
+    """
+
+    def __init__(self, batch_size: int = 1000, dry_run: bool = False) -> None:
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.category_ids: dict[str, int] = dict(Category.objects.values_list("slug", "id"))
+        self.stats = ImportStats()
+
+    def run(
+        self,
+        rows: Iterable[dict[str, Any]],
+        progress: Optional[Callable[[ImportStats], None]] = None,
+    ) -> ImportStats:
+        for batch in batched(rows, self.batch_size):
+            self.import_batch(batch)
+            if progress:
+                progress(self.stats)
+        if not self.dry_run:
+            # bulk_create не шлёт сигналов — сбрасываем кэши каталога явно
+            invalidate_category_tree()
+            suggest_service.invalidate()
+            catalog_engine.invalidate()
+        return self.stats
+
+    def import_batch(self, batch: list[dict[str, Any]]) -> None:
+        self.stats.rows += len(batch)
+        with transaction.atomic():
+            self._upsert_categories(batch)
+            # ON CONFLICT не может обновить одну строку дважды за запрос — дубли в пачке схлопываем
+            by_slug = {p.slug: p for p in (self._build_product(row) for row in batch) if p is not None}
+            products = list(by_slug.values())
+            if products and not self.dry_run:
+                Product.objects.bulk_create(
+                    products,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=["slug"],
+                    update_fields=PRODUCT_UPDATE_FIELDS,
+                )
+                # Остаток шардированных товаров живёт в шардах — раскладываем импортированный
+                for product in Product.objects.filter(slug__in=list(by_slug), stock_shards__gt=0):
+                    set_stock(product, by_slug[product.slug].stock)
+            self.stats.products += len(products)
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+    def _upsert_categories(self, batch: list[dict[str, Any]]) -> None:
+        # slug -> (name, parent_slug); последнее упоминание в пачке побеждает
+        pending: dict[str, tuple[str, str]] = {}
+        for row in batch:
+            slug = _clean(row.get("category_slug"))
+            if not slug:
+                continue
+            name = _clean(row.get("category_name"))
+            if slug in self.category_ids and not name:
+                continue
+            pending[slug] = (name or slug, _clean(row.get("category_parent_slug")))
+
+        # Родитель должен существовать раньше потомка: создаём уровнями
+        while pending:
+            ready = {
+                slug: data for slug, data in pending.items()
+                if not data[1] or data[1] in self.category_ids
+            }
+            if not ready:
+                for slug, (_, parent) in pending.items():
+                    self.stats.errors.append(f"категория {slug}: неизвестный родитель {parent}")
+                break
+            objs = [
+                Category(slug=slug, name=name, parent_id=self.category_ids.get(parent) if parent else None)
+                for slug, (name, parent) in ready.items()
+            ]
+            Category.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["slug"],
+                update_fields=["name", "parent", "updated_at"],
+            )
+            self.category_ids.update(Category.objects.filter(slug__in=list(ready)).values_list("slug", "id"))
+            self.stats.categories += len(ready)
+            for slug in ready:
+                del pending[slug]
+
+    def _build_product(self, row: dict[str, Any]) -> Optional[Product]:
+        slug = _clean(row.get("slug"))
+        category_slug = _clean(row.get("category_slug"))
+        try:
+            if not slug:
+                raise CatalogImportError("не указан slug")
+            category_id = self.category_ids.get(category_slug)
+            if category_id is None:
+                raise CatalogImportError(f"неизвестная категория {category_slug!r}")
+            price = Decimal(_clean(row.get("price")) or "0")
+            if price < 0:
+                raise CatalogImportError("отрицательная цена")
+            stock = int(_clean(row.get("stock")) or 0)
+            if stock < 0:
+                raise CatalogImportError("отрицательный остаток")
+        except (CatalogImportError, InvalidOperation, ValueError) as exc:
+            self.stats.skipped += 1
+            self.stats.errors.append(f"товар {slug or '?'}: {exc}")
+            return None
+        return Product(
+            slug=slug,
+            name=_clean(row.get("name")) or slug,
+            description=_clean(row.get("description")),
+            price=price,
+            stock=stock,
+            is_active=_parse_bool(row.get("is_active")),
+            category_id=category_id,
+        )
+
+
+def iter_catalog(chunk_size: int = 2000) -> Iterator[dict[str, Any]]:
+    """Построчно отдаёт каталог в формате импорта: страницами по pk, в памяти не больше chunk_size товаров."""
+    qs = Product.objects.select_related("category__parent").only(
+        "slug", "name", "description", "price", "stock", "is_active",
+        "category__slug", "category__name", "category__parent__slug",
+    )
+    for chunk in iter_keyset(qs, chunk_size):
+        for product in chunk:
+            parent = product.category.parent
+            yield {
+                "slug": product.slug,
+                "name": product.name,
+                "description": product.description,
+                "price": str(product.price),
+                "stock": product.stock,
+                "is_active": product.is_active,
+                "category_slug": product.category.slug,
+                "category_name": product.category.name,
+                "category_parent_slug": parent.slug if parent else "",
+            }
+
+
+def write_rows(stream: IO[str], rows: Iterable[dict[str, Any]], fmt: str) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False))
+        stream.write("\n")
+        count += 1
+    return count
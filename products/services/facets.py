@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+from decimal import Decimal
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, QuerySet, Value, When
+
+from products.models import Category, Product
+
+CATEGORY_TREE_CACHE_KEY = "catalog:category_tree"
+FACETS_CACHE_PREFIX = "catalog:facets:"
+RATING_LEVELS = (4, 3, 2, 1)
+
+# id -> (parent_id, name, slug)
+CategoryTree = dict[int, tuple[Optional[int], str, str]]
+
+
+def category_tree() -> CategoryTree:
+    """Всё дерево категорий одним запросом, закэшировано до изменения любой категории."""
+    tree: Optional[CategoryTree] = cache.get(CATEGORY_TREE_CACHE_KEY)
+    if tree is None:
+        tree = {
+            pk: (parent_id, name, slug)
+            for pk, parent_id, name, slug in Category.objects.values_list("id", "parent_id", "name", "slug")
+        }
+        cache.set(CATEGORY_TREE_CACHE_KEY, tree, None)
+    return tree
+
+
+def invalidate_category_tree() -> None:
+    cache.delete(CATEGORY_TREE_CACHE_KEY)
+
+
+def descendant_ids(root_id: int, tree: Optional[CategoryTree] = None) -> list[int]:
+    tree = tree if tree is not None else category_tree()
+    children: dict[Optional[int], list[int]] = {}
+    for pk, (parent_id, _, _) in tree.items():
+        children.setdefault(parent_id, []).append(pk)
+    ids = [root_id]
+    level = [root_id]
+    while level:
+        level = [child for pk in level for child in children.get(pk, [])]
+        ids.extend(level)
+    return ids
+
+
+def price_edges() -> list[Decimal]:
+    return [Decimal(str(edge)) for edge in settings.CATALOG_FACET_PRICE_EDGES]
+
+
+def _price_bucket_expr(edges: list[Decimal]) -> Case:
+    # Корзина i — [edges[i-1], edges[i]); ссылка корзины фильтрует так же: min_price (gte) и price_below (lt)
+    whens = [When(price__lt=edge, then=Value(i)) for i, edge in enumerate(edges)]
+    return Case(*whens, default=Value(len(edges)), output_field=IntegerField())
+
+
+def _rating_bucket_expr() -> Case:
+    whens = [When(rating_avg__gte=level, then=Value(level)) for level in RATING_LEVELS]
+    return Case(*whens, default=Value(0), output_field=IntegerField())
+
+
+def _price_buckets(edges: list[Decimal], counts: dict[int, int]) -> list[dict[str, Any]]:
+    buckets = []
+    bounds = [None, *edges, None]
+    for i in range(len(edges) + 1):
+        low, high = bounds[i], bounds[i + 1]
+        if low is None:
+            label = f"до {high}"
+        elif high is None:
+            label = f"от {low}"
+        else:
+            label = f"{low}–{high}"
+        buckets.append({
+            "min": None if low is None else str(low),
+            "max": None if high is None else str(high),
+            "label": label,
+            "count": counts.get(i, 0),
+        })
+    return buckets
+
+
+def compute_facets(qs: QuerySet[Product]) -> dict[str, Any]:
+    """
+    Фасеты для текущего состояния поиска/фильтров одним сгруппированным запросом:
+    группировка по (категория, корзина цены, корзина рейтинга, наличие), дальше свёртка в Python.
+    Результат кэшируется по SQL запроса на CATALOG_FACETS_CACHE_TIMEOUT секунд.
+    """
+    edges = price_edges()
+    base = qs.order_by()
+    sql, params = base.query.sql_with_params()
+    cache_key = FACETS_CACHE_PREFIX + hashlib.sha1(f"{sql}|{params}|{edges}".encode()).hexdigest()
+    cached: Optional[dict[str, Any]] = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    rows = (
+        base.annotate(
+            price_bucket=_price_bucket_expr(edges),
+            rating_bucket=_rating_bucket_expr(),
+            in_stock=Case(When(stock__gt=0, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        )
+        .values("category_id", "price_bucket", "rating_bucket", "in_stock")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+    total = in_stock = 0
+    direct: dict[int, int] = {}
+    prices: dict[int, int] = {}
+    ratings: dict[int, int] = {}
+    for row in rows:
+        n = row["n"]
+        total += n
+        in_stock += n if row["in_stock"] else 0
+        direct[row["category_id"]] = direct.get(row["category_id"], 0) + n
+        prices[row["price_bucket"]] = prices.get(row["price_bucket"], 0) + n
+        ratings[row["rating_bucket"]] = ratings.get(row["rating_bucket"], 0) + n
+
+    # Подсчёт по поддереву: каждый товар учитывается во всех предках своей категории
+    tree = category_tree()
+    subtree: dict[int, int] = {}
+    for category_id, n in direct.items():
+        current: Optional[int] = category_id
+        seen: set[int] = set()
+        while current is not None and current not in seen:
+            seen.add(current)
+            subtree[current] = subtree.get(current, 0) + n
+            current = tree[current][0] if current in tree else None
+
+    categories: list[dict[str, Any]] = [
+        {"id": pk, "name": tree[pk][1], "slug": tree[pk][2], "parent_id": tree[pk][0], "count": count}
+        for pk, count in subtree.items() if pk in tree
+    ]
+    categories.sort(key=lambda c: c["name"])
+
+    facets = {
+        "total": total,
+        "categories": categories,
+        "price": _price_buckets(edges, prices),
+        "availability": {"in_stock": in_stock, "out_of_stock": total - in_stock},
+        # «N и выше»: накопительно от старших оценок к младшим
+        "rating": [
+            {"min_rating": level, "count": sum(c for bucket, c in ratings.items() if bucket >= level)}
+            for level in RATING_LEVELS
+        ],
+    }
+    cache.set(cache_key, facets, settings.CATALOG_FACETS_CACHE_TIMEOUT)
+    return facets
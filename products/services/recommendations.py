@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import itertools
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from datetime import timedelta
+from typing import Any, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Max, Q, QuerySet
+from django.utils import timezone
+
+from orders.models import ArchivedOrderItem, OrderItem
+from products.models import Product, ProductRelation, ProductView, RelatedProductsBuild
+
+
+@lru_cache(maxsize=1)
+def load_numpy() -> Any:
+    # NumPy необязателен: без него соседи считаются построчно в чистом Python.
+    # Импорт при первом расчёте, а не при загрузке модуля: views импортируют его на старте воркера
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# (ключ корзины, product_id); ключ — id заказа или сессия просмотров
+Basket = tuple[Any, int]
+# product_id -> [(related_id, score)] по убыванию score
+Neighbours = dict[int, list[tuple[int, float]]]
+
+
+@dataclass
+class BuildOptions:
+    top_k: int = 10
+    views_weight: float = 0.3
+    views_days: int = 30
+    max_basket: int = 50
+    use_numpy: bool = True
+
+
+@dataclass
+class BuildResult:
+    full: bool
+    last_order_id: int
+    products_updated: int = 0
+    pairs: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+def order_baskets(product_ids: Optional[set[int]] = None, upto_order_id: Optional[int] = None) -> list[Basket]:
+    """
+    Позиции неотменённых заказов (включая архивные); при product_ids — только заказы,
+    где есть хотя бы один из товаров.
+    """
+    baskets: list[Basket] = []
+    for model in (OrderItem, ArchivedOrderItem):
+        qs = model.objects.exclude(order__status="cancelled").filter(product__isnull=False)
+        if upto_order_id is not None:
+            qs = qs.filter(order_id__lte=upto_order_id)
+        if product_ids is not None:
+            qs = qs.filter(order_id__in=model.objects.filter(product_id__in=product_ids).values("order_id"))
+        baskets.extend(qs.values_list("order_id", "product_id").order_by("order_id"))
+    # id архивного заказа — исходный id заказа, поэтому корзины не пересекаются
+    baskets.sort(key=lambda basket: basket[0])
+    return baskets
+
+
+def view_baskets(days: int, product_ids: Optional[set[int]] = None) -> list[Basket]:
+    """Уникальные (посетитель, товар) из сырых просмотров за последние `days` дней."""
+    qs: QuerySet[ProductView] = ProductView.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=days)
+    ).exclude(visitor_id="")
+    if product_ids is not None:
+        qs = qs.filter(visitor_id__in=ProductView.objects.filter(product_id__in=product_ids).values("visitor_id"))
+    return list(qs.values_list("visitor_id", "product_id").distinct().order_by("visitor_id"))
+
+
+def _co_counts_python(baskets: Iterable[Basket], weight: float, max_basket: int,
+                      into: dict[tuple[int, int], float]) -> None:
+    for _, group in itertools.groupby(baskets, key=lambda row: row[0]):
+        items = sorted({pid for _, pid in group})
+        if len(items) < 2 or len(items) > max_basket:
+            continue
+        for a, b in itertools.combinations(items, 2):
+            into[(a, b)] = into.get((a, b), 0.0) + weight
+            into[(b, a)] = into.get((b, a), 0.0) + weight
+
+
+def _co_counts_numpy(baskets: list[Basket], weight: float, max_basket: int) -> tuple[Any, Any, Any]:
+    """
+    Векторизованный self-join корзин: для каждой позиции повторяем её столько раз,
+    сколько позиций в корзине, и сопоставляем со всеми позициями той же корзины.
+    Возвращает массивы (a, b, вес) без диагонали a == b.
+    """
+    np = load_numpy()
+    _, basket_idx = np.unique(np.asarray([key for key, _ in baskets]), return_inverse=True)
+    products = np.fromiter((pid for _, pid in baskets), dtype=np.int64, count=len(baskets))
+    # уникальные (корзина, товар), отсортированные по корзине
+    pairs = np.unique(np.stack([basket_idx.astype(np.int64), products], axis=1), axis=0)
+    basket_idx, products = pairs[:, 0], pairs[:, 1]
+    sizes = np.bincount(basket_idx)
+    keep = (sizes[basket_idx] >= 2) & (sizes[basket_idx] <= max_basket)
+    basket_idx, products = basket_idx[keep], products[keep]
+    if not len(products):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    sizes = np.bincount(basket_idx)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    per_item = sizes[basket_idx]
+    left = np.repeat(np.arange(len(products)), per_item)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(per_item) - per_item, per_item)
+    right = np.repeat(starts[basket_idx], per_item) + offsets
+    mask = left != right
+    a, b = products[left[mask]], products[right[mask]]
+    return a, b, np.full(len(a), weight)
+
+
+def co_occurrence(sources: list[tuple[list[Basket], float]], opts: BuildOptions,
+                  only: Optional[set[int]] = None) -> Neighbours:
+    """Взвешенная матрица совместной встречаемости, свёрнутая в top-K соседей для каждого товара."""
+    if opts.use_numpy and load_numpy() is not None:
+        return _top_k_numpy(sources, opts, only)
+    counts: dict[tuple[int, int], float] = {}
+    for baskets, weight in sources:
+        _co_counts_python(baskets, weight, opts.max_basket, counts)
+    grouped: dict[int, list[tuple[int, float]]] = defaultdict(list)
+    for (a, b), score in counts.items():
+        if only is None or a in only:
+            grouped[a].append((b, score))
+    return {a: sorted(rows, key=lambda r: (-r[1], r[0]))[:opts.top_k] for a, rows in grouped.items()}
+
+
+def _top_k_numpy(sources: list[tuple[list[Basket], float]], opts: BuildOptions,
+                 only: Optional[set[int]]) -> Neighbours:
+    np = load_numpy()
+    parts = [_co_counts_numpy(baskets, weight, opts.max_basket) for baskets, weight in sources if baskets]
+    if not parts:
+        return {}
+    a = np.concatenate([p[0] for p in parts])
+    b = np.concatenate([p[1] for p in parts])
+    w = np.concatenate([p[2] for p in parts])
+    if only is not None:
+        keep = np.isin(a, np.fromiter(only, dtype=np.int64, count=len(only)))
+        a, b, w = a[keep], b[keep], w[keep]
+    if not len(a):
+        return {}
+    # Разреженная матрица в COO: суммируем веса одинаковых (a, b)
+    pairs, inverse = np.unique(np.stack([a, b], axis=1), axis=0, return_inverse=True)
+    scores = np.bincount(inverse.reshape(-1), weights=w)
+    # Сортировка: по a, затем по убыванию score, затем по b; берём первые top_k в каждой группе
+    order = np.lexsort((pairs[:, 1], -scores, pairs[:, 0]))
+    pairs, scores = pairs[order], scores[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(pairs[:, 0])) + 1]
+    rank = np.arange(len(pairs)) - np.repeat(group_start, np.diff(np.r_[group_start, len(pairs)]))
+    top = rank < opts.top_k
+    result: Neighbours = defaultdict(list)
+    for pa, pb, sc in zip(pairs[top, 0].tolist(), pairs[top, 1].tolist(), scores[top].tolist()):
+        result[pa].append((pb, sc))
+    return dict(result)
+
+
+def store_neighbours(neighbours: Neighbours, product_ids: Optional[set[int]]) -> int:
+    """Заменяет соседей указанных товаров (или всех при полном пересчёте)."""
+    rows = [
+        ProductRelation(product_id=pid, related_id=rel, rank=rank, score=score)
+        for pid, items in neighbours.items()
+        for rank, (rel, score) in enumerate(items, start=1)
+    ]
+    with transaction.atomic():
+        stale = ProductRelation.objects.all()
+        if product_ids is not None:
+            stale = stale.filter(product_id__in=product_ids)
+        stale.delete()
+        ProductRelation.objects.bulk_create(rows, batch_size=2000)
+    return len(neighbours)
+
+
+def build_related(opts: BuildOptions, full: bool = False) -> BuildResult:
+    """
+    Полный пересчёт или инкрементальный: берутся заказы после водяного знака и заказы, изменённые
+    после прошлого расчёта (отмена убирает их пары), и соседи пересчитываются только для товаров
+    из этих заказов (по всем корзинам, где они встречаются).
+
+    Инкрементальный расчёт приблизителен по просмотрам: скользящее окно views_days обновляется
+    только для затронутых товаров, у остальных вклад просмотров остаётся от прошлого расчёта.
+    Поэтому раз в сутки нужен полный пересчёт.
+    """
+    started_at = timezone.now()
+    last = RelatedProductsBuild.objects.first()
+    last_order_id = OrderItem.objects.aggregate(m=Max("order_id"))["m"] or 0
+    result = BuildResult(full=full or last is None, last_order_id=last_order_id)
+
+    affected: Optional[set[int]] = None
+    if not result.full and last is not None:
+        changed = Q(order_id__gt=last.last_order_id, order_id__lte=last_order_id) | Q(
+            order__updated_at__gte=last.built_at
+        )
+        affected = set(
+            OrderItem.objects.filter(changed, product__isnull=False).values_list("product_id", flat=True).distinct()
+        )
+        if not affected:
+            return result
+
+    sources: list[tuple[list[Basket], float]] = [(order_baskets(affected, last_order_id), 1.0)]
+    if opts.views_weight > 0:
+        sources.append((view_baskets(opts.views_days, affected), opts.views_weight))
+    neighbours = co_occurrence(sources, opts, only=affected)
+    result.pairs = sum(len(v) for v in neighbours.values())
+
+    # Старые связи затронутых товаров удаляются, даже если новых соседей у них нет
+    result.products_updated = store_neighbours(neighbours, affected)
+    RelatedProductsBuild.objects.create(
+        last_order_id=last_order_id, full=result.full, products_updated=result.products_updated, built_at=started_at
+    )
+    return result
+
+
+def related_products(product: Product, limit: int = 8) -> list[Product]:
+    """Соседи товара одним индексным запросом (product_id, rank) с join на сами товары."""
+    links = (
+        ProductRelation.objects.filter(product=product, related__is_active=True)
+        .select_related("related", "related__category")
+        .order_by("rank")[:limit]
+    )
+    return [link.related for link in links]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import Q
+
+from products.models import Product, Review
+
+REVIEWS_PAGE_SIZE = 10
+
+
+@dataclass
+class ReviewPage:
+    reviews: list[Review]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(review: Review) -> str:
+    return f"{review.created_at.isoformat()}~{review.pk}"
+
+
+def decode_cursor(raw: str) -> Optional[tuple[datetime, int]]:
+    created_raw, _, pk_raw = raw.rpartition("~")
+    try:
+        return datetime.fromisoformat(created_raw), int(pk_raw)
+    except ValueError:
+        return None
+
+
+def review_page(product: Product, cursor: Optional[str] = None, size: int = REVIEWS_PAGE_SIZE) -> ReviewPage:
+    """
+    Страница отзывов по ключу (created_at, id) — без OFFSET и COUNT(*):
+    берём size + 1 строк, лишняя говорит о наличии следующей страницы.
+    """
+    qs = product.reviews.select_related("user").order_by("-created_at", "-id")
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        created_at, pk = position
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    rows = list(qs[:size + 1])
+    reviews = rows[:size]
+    next_cursor = encode_cursor(reviews[-1]) if len(rows) > size else None
+    return ReviewPage(reviews=reviews, next_cursor=next_cursor)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import random
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Product, StockShard
+from products.services.catalog_engine import catalog_engine
+
+
+def take_stock(product: Product, quantity: int) -> bool:
+    """
+    Списывает quantity условным UPDATE (… WHERE остаток >= quantity) без предварительного чтения:
+    две параллельные покупки не продадут больше, чем есть. False — товара не хватает.
+    Вызывать внутри транзакции заказа: строка остатка остаётся заблокированной до коммита.
+    """
+    if not product.stock_shards:
+        # updated_at — чтобы сменилась версия закэшированной карточки товара
+        taken = bool(Product.objects.filter(pk=product.pk, stock__gte=quantity).update(
+            stock=F("stock") - quantity, updated_at=timezone.now(),
+        ))
+        if taken:
+            transaction.on_commit(lambda: _stock_taken(product.pk), robust=True)
+        return taken
+    # Шарды перебираются со случайного: параллельные заказы блокируют разные строки
+    start = random.randrange(product.stock_shards)
+    for i in range(product.stock_shards):
+        shard = (start + i) % product.stock_shards
+        if StockShard.objects.filter(product_id=product.pk, shard=shard, quantity__gte=quantity).update(
+            quantity=F("quantity") - quantity,
+        ):
+            # После коммита, вне транзакции заказа (сбой не ломает заказ): витринный остаток — сумма шардов;
+            # если первый шард был пуст — ещё и выравниваем шарды
+            transaction.on_commit(lambda: _stock_taken(product.pk, sharded=True, rebalance=bool(i)), robust=True)
+            return True
+    return _take_across_shards(product, quantity)
+
+
+def _stock_taken(product_id: int, sharded: bool = False, rebalance: bool = False) -> None:
+    """Списание закоммичено: Product.stock и updated_at (карточки, фасеты), строка снимка каталога."""
+    if rebalance:
+        stock = rebalance_stock(product_id)
+    else:
+        if sharded:
+            # Без блокировки шардов: сумма закоммиченных значений одним UPDATE
+            total = StockShard.objects.filter(product_id=OuterRef("pk")).values("product_id").annotate(
+                s=Sum("quantity")
+            ).values("s")
+            Product.objects.filter(pk=product_id).update(
+                stock=Coalesce(Subquery(total), 0), updated_at=timezone.now(),
+            )
+        stock = Product.objects.filter(pk=product_id).values_list("stock", flat=True).first() or 0
+    catalog_engine.stock_changed(product_id, stock)
+
+
+def _take_across_shards(product: Product, quantity: int) -> bool:
+    """Ни в одном шарде не хватает целиком: блокируем все шарды товара и собираем из нескольких."""
+    with transaction.atomic():
+        shards = list(StockShard.objects.select_for_update().filter(product_id=product.pk).order_by("shard"))
+        total = sum(s.quantity for s in shards)
+        if total < quantity:
+            return False
+        _distribute(product.pk, shards, total - quantity)
+        transaction.on_commit(lambda: catalog_engine.stock_changed(product.pk, total - quantity), robust=True)
+    return True
+
+
+def _distribute(product_id: int, shards: list[StockShard], total: int) -> None:
+    """Раскладывает total поровну по (уже заблокированным) шардам и обновляет витринный Product.stock."""
+    base, extra = divmod(total, len(shards))
+    for i, shard in enumerate(shards):
+        shard.quantity = base + (1 if i < extra else 0)
+    StockShard.objects.bulk_update(shards, ["quantity"])
+    Product.objects.filter(pk=product_id).update(stock=total, updated_at=timezone.now())
+
+
+def rebalance_stock(product_id: int) -> int:
+    """Выравнивает шарды товара (пустой шард снова может обслуживать заказы). Возвращает общий остаток."""
+    with transaction.atomic():
+        shards = list(StockShard.objects.select_for_update().filter(product_id=product_id).order_by("shard"))
+        if not shards:
+            return 0
+        total = sum(s.quantity for s in shards)
+        _distribute(product_id, shards, total)
+    return total
+
+
+def set_stock(product: Product, quantity: int) -> None:
+    """Новый остаток товара (админка, импорт): у шардированного — раскладывается по шардам."""
+    with transaction.atomic():
+        if not product.stock_shards:
+            Product.objects.filter(pk=product.pk).update(stock=quantity, updated_at=timezone.now())
+            return
+        shards = list(StockShard.objects.select_for_update().filter(product_id=product.pk).order_by("shard"))
+        _distribute(product.pk, shards, quantity)
+
+
+def shard_stock(product: Product, shards: int) -> None:
+    """Включает (shards > 0), меняет число шардов или выключает (0) шардирование остатка товара."""
+    with transaction.atomic():
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+        existing = list(StockShard.objects.select_for_update().filter(product_id=product.pk))
+        total = sum(s.quantity for s in existing) if locked.stock_shards else locked.stock
+        StockShard.objects.filter(product_id=product.pk).delete()
+        new_shards = StockShard.objects.bulk_create(
+            StockShard(product_id=product.pk, shard=i) for i in range(shards)
+        )
+        Product.objects.filter(pk=product.pk).update(stock_shards=shards)
+        if new_shards:
+            _distribute(product.pk, new_shards, total)
+        else:
+            Product.objects.filter(pk=product.pk).update(stock=total, updated_at=timezone.now())
+    product.stock_shards, product.stock = shards, total
+
+
+def available_stock(products: Iterable[Product]) -> dict[int, int]:
+    """Точный остаток по id: у шардированных — сумма шардов одним агрегатом, у остальных — Product.stock."""
+    products = list(products)
+    levels = {p.pk: p.stock for p in products}
+    sharded = [p.pk for p in products if p.stock_shards]
+    if sharded:
+        levels.update(
+            StockShard.objects.filter(product_id__in=sharded)
+            .values("product_id").annotate(total=Sum("quantity")).values_list("product_id", "total")
+        )
+    return levels
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from config.counters import incr_counter
+from products.models import Category, Product
+
+VERSION_CACHE_KEY = "catalog:suggest:version"
+# Поля товара в индексе; популярность догоняет при плановой перестройке (SUGGEST_INDEX_MAX_AGE)
+INDEXED_FIELDS = ("name", "slug", "price", "is_active")
+WORD_RE = re.compile(r"\w+")
+
+# (вид, id): вид "p" — товар, "c" — категория
+EntryKey = tuple[str, int]
+
+
+@dataclass
+class Entry:
+    kind: str
+    id: int
+    name: str
+    slug: str
+    score: int
+    price: Optional[str] = None
+
+
+def normalize_words(text: str) -> list[str]:
+    return WORD_RE.findall(text.lower().replace("ё", "е"))
+
+
+class PrefixIndex:
+    """
+    Отсортированный массив (слово, вид, id) по словам названий: все слова с префиксом
+    находятся двумя bisect'ами. Запрос из нескольких слов — пересечение по каждому слову
+    (последнее обычно недописано, поэтому тоже ищется как префикс).
+    """
+
+    def __init__(self) -> None:
+        self.tokens: list[tuple[str, str, int]] = []
+        self.entries: dict[EntryKey, Entry] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls, entries: list[Entry]) -> PrefixIndex:
+        index = cls()
+        index.entries = {(e.kind, e.id): e for e in entries}
+        index.tokens = sorted({(word, e.kind, e.id) for e in entries for word in normalize_words(e.name)})
+        return index
+
+    def upsert(self, entry: Entry) -> None:
+        with self.lock:
+            self._remove((entry.kind, entry.id))
+            self.entries[(entry.kind, entry.id)] = entry
+            for word in set(normalize_words(entry.name)):
+                bisect.insort(self.tokens, (word, entry.kind, entry.id))
+
+    def remove(self, key: EntryKey) -> None:
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key: EntryKey) -> None:
+        old = self.entries.pop(key, None)
+        if old is None:
+            return
+        for word in set(normalize_words(old.name)):
+            i = bisect.bisect_left(self.tokens, (word, *key))
+            if i < len(self.tokens) and self.tokens[i] == (word, *key):
+                del self.tokens[i]
+
+    def _prefix_matches(self, prefix: str) -> set[EntryKey]:
+        start = bisect.bisect_left(self.tokens, (prefix,))
+        # "\uffff" больше любого символа слова — верхняя граница диапазона префикса
+        end = bisect.bisect_left(self.tokens, (prefix + "\uffff",), lo=start)
+        return {(kind, pk) for _, kind, pk in self.tokens[start:end]}
+
+    def search(self, query: str) -> list[Entry]:
+        """Все записи, где каждое слово запроса — префикс какого-то слова названия."""
+        words = normalize_words(query)
+        if not words:
+            return []
+        with self.lock:
+            # Сначала самое длинное слово — у него обычно меньше всего совпадений
+            found: Optional[set[EntryKey]] = None
+            for word in sorted(words, key=len, reverse=True):
+                matches = self._prefix_matches(word)
+                found = matches if found is None else found & matches
+                if not found:
+                    return []
+            return [self.entries[key] for key in found or ()]
+
+
+def load_entries() -> list[Entry]:
+    """Два запроса без join: активные товары и категории (популярность категории — число её товаров)."""
+    products = [
+        Entry("p", pk, name, slug, view_count + 5 * reviews_count, str(price))
+        for pk, name, slug, view_count, reviews_count, price in Product.objects.filter(is_active=True)
+        .values_list("id", "name", "slug", "view_count", "reviews_count", "price").iterator()
+    ]
+    counts: dict[int, int] = {}
+    for category_id in Product.objects.filter(is_active=True).values_list("category_id", flat=True).iterator():
+        counts[category_id] = counts.get(category_id, 0) + 1
+    categories = [
+        Entry("c", pk, name, slug, counts.get(pk, 0))
+        for pk, name, slug in Category.objects.values_list("id", "name", "slug")
+    ]
+    return products + categories
+
+
+def _rank(entry: Entry) -> tuple[int, str]:
+    return -entry.score, entry.name
+
+
+class SuggestService:
+    """
+    Индекс в памяти процесса. Сохранение товара/категории обновляет индекс этого процесса
+    на месте и увеличивает общую версию в кэше; остальные процессы, увидев чужую версию,
+    перестраивают индекс целиком. Раз в SUGGEST_INDEX_MAX_AGE секунд индекс перестраивается
+    в любом случае — чтобы подтянуть популярность (просмотры пишутся через UPDATE без сигналов).
+    """
+
+    def __init__(self) -> None:
+        self.index: Optional[PrefixIndex] = None
+        self.version: Any = None
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def get_index(self) -> PrefixIndex:
+        version = cache.get(VERSION_CACHE_KEY)
+        stale = time.monotonic() - self.built_at > settings.SUGGEST_INDEX_MAX_AGE
+        if self.index is None or version != self.version or stale:
+            with self.lock:
+                if self.index is None or version != self.version or stale:
+                    self.index = PrefixIndex.build(load_entries())
+                    self.version = version
+                    self.built_at = time.monotonic()
+        return self.index
+
+    def _bump_version(self) -> None:
+        version = incr_counter(VERSION_CACHE_KEY)
+        # Свой индекс уже актуален — перестраивать его из-за своей же версии незачем
+        if version == (self.version or 0) + 1:
+            self.version = version
+        else:
+            self.index = None
+
+    @staticmethod
+    def product_entry(product: Product) -> Optional[Entry]:
+        """Запись товара для индекса; неактивный товар в индексе не нужен — None."""
+        if not product.is_active:
+            return None
+        return Entry(
+            "p", product.pk, product.name, product.slug,
+            product.view_count + 5 * product.reviews_count, str(product.price),
+        )
+
+    def product_changed(self, product_id: int, entry: Optional[Entry]) -> None:
+        if self.index is not None:
+            if entry is not None:
+                self.index.upsert(entry)
+            else:
+                self.index.remove(("p", product_id))
+        self._bump_version()
+
+    def product_deleted(self, product_id: int) -> None:
+        if self.index is not None:
+            self.index.remove(("p", product_id))
+        self._bump_version()
+
+    def category_changed(self, category_id: int, name: str, slug: str) -> None:
+        if self.index is not None:
+            old = self.index.entries.get(("c", category_id))
+            self.index.upsert(Entry("c", category_id, name, slug, old.score if old else 0))
+        self._bump_version()
+
+    def category_deleted(self, category_id: int) -> None:
+        if self.index is not None:
+            self.index.remove(("c", category_id))
+        self._bump_version()
+
+    def invalidate(self) -> None:
+        """Для массовых изменений без сигналов (импорт каталога): все процессы перестроят индекс."""
+        self.index = None
+        self._bump_version()
+
+    def suggest(self, query: str, limit: int = 10) -> dict[str, Any]:
+        found = self.get_index().search(query)
+        categories = heapq.nsmallest(3, (e for e in found if e.kind == "c"), key=_rank)
+        products = heapq.nsmallest(limit, (e for e in found if e.kind == "p"), key=_rank)
+        return {
+            "query": query,
+            "categories": [{"id": e.id, "name": e.name, "slug": e.slug} for e in categories],
+            "products": [{"id": e.id, "name": e.name, "slug": e.slug, "price": e.price} for e in products],
+        }
+
+
+suggest_service = SuggestService()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Protocol
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from config.counters import incr_counter, read_counters
+from products.services.visitor import get_visitor_id
+
+# Подстроки User-Agent краулеров, мониторингов и HTTP-библиотек
+BOT_UA_RE = re.compile(
+    r"bot|crawl|spider|slurp|archiver|fetch|scrap|curl|wget|python-|httpclient|okhttp|java/|go-http|"
+    r"headless|phantom|lighthouse|pingdom|uptime|monitor|preview|facebookexternalhit",
+    re.IGNORECASE,
+)
+
+STATS_PREFIX = "product_views:stats:"
+STATS_KEYS = ("recorded", "bot", "duplicate")
+
+
+class DedupBackend(Protocol):
+    def add(self, key: str, ttl: int) -> bool:
+        """Запоминает ключ на ttl секунд. False — ключ уже был (повтор)."""
+        ...
+
+
+class MemoryDedupBackend:
+    """Ограниченный LRU в памяти процесса: самые старые ключи вытесняются при переполнении."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, ttl: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            expires = self._data.get(key)
+            if expires is not None and expires > now:
+                self._data.move_to_end(key)
+                return False
+            self._data[key] = now + ttl
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return True
+
+
+class CacheDedupBackend:
+    """Через cache framework: cache.add атомарен и общий для всех воркеров при общем бэкенде."""
+
+    prefix = "product_views:seen:"
+
+    def add(self, key: str, ttl: int) -> bool:
+        return bool(cache.add(self.prefix + key, 1, ttl))
+
+
+def is_bot(request: HttpRequest) -> bool:
+    user_agent = request.META.get("HTTP_USER_AGENT", "")
+    return not user_agent or bool(BOT_UA_RE.search(user_agent))
+
+
+def client_ip(request: HttpRequest) -> str:
+    return request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")[0].strip() or request.META.get("REMOTE_ADDR", "")
+
+
+def visitor_identity(request: HttpRequest) -> str:
+    if request.user.is_authenticated:
+        return f"u{request.user.pk}"
+    visitor_id = get_visitor_id(request)
+    if visitor_id:
+        return f"v{visitor_id}"
+    return f"ip{client_ip(request)}"
+
+
+class ViewDeduplicator:
+    def __init__(self, backend: DedupBackend, window: int) -> None:
+        self.backend = backend
+        self.window = window
+
+    def should_record(self, request: HttpRequest, product_id: int) -> bool:
+        """Решает, писать ли просмотр в БД, и учитывает отброшенные записи в счётчиках."""
+        if is_bot(request):
+            _incr("bot")
+            return False
+        if self.window > 0 and not self.backend.add(f"{product_id}:{visitor_identity(request)}", self.window):
+            _incr("duplicate")
+            return False
+        _incr("recorded")
+        return True
+
+
+def _incr(name: str) -> None:
+    incr_counter(STATS_PREFIX + name)
+
+
+def dedup_stats() -> dict[str, int]:
+    """Счётчики с момента старта кэша: записано / отброшено как бот / отброшено как повтор."""
+    return read_counters(STATS_PREFIX, STATS_KEYS)
+
+
+@lru_cache(maxsize=1)
+def get_deduplicator() -> ViewDeduplicator:
+    conf: dict[str, Any] = settings.PRODUCT_VIEW_DEDUP
+    backend: DedupBackend
+    if conf["BACKEND"] == "memory":
+        backend = MemoryDedupBackend(conf["MAX_ENTRIES"])
+    else:
+        backend = CacheDedupBackend()
+    return ViewDeduplicator(backend, conf["WINDOW"])
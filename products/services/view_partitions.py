@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Optional
+
+from django.db import connection, transaction
+
+from products.models import ProductView
+
+# Помесячное RANGE-партиционирование products_productview (только PostgreSQL).
+# Первичный ключ партиционированной таблицы обязан включать ключ партиции,
+# поэтому он становится (id, created_at); для Django pk по-прежнему id.
+# Identity-колонки у партиционированных таблиц появились только в PG 17,
+# поэтому id получает обычную sequence по умолчанию.
+
+TABLE = ProductView._meta.db_table
+LEGACY_TABLE = f"{TABLE}_legacy"
+SEQUENCE = f"{TABLE}_part_id_seq"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+class PartitioningError(RuntimeError):
+    pass
+
+
+def _require_postgres() -> None:
+    if connection.vendor != "postgresql":
+        raise PartitioningError("Партиционирование просмотров поддерживается только на PostgreSQL.")
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> list[tuple[str, Optional[datetime]]]:
+    """Партиции с верхней границей диапазона (None — default-партиция)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = %s
+            ORDER BY c.relname
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    result: list[tuple[str, Optional[datetime]]] = []
+    for name, bound in rows:
+        upper: Optional[datetime] = None
+        if bound and "TO (" in bound:
+            raw = bound.split("TO ('", 1)[1].split("')", 1)[0]
+            upper = datetime.fromisoformat(raw)
+        result.append((name, upper))
+    return result
+
+
+def create_month_partition(month: date) -> bool:
+    """Создаёт партицию на месяц, если её ещё нет. Возвращает True, если создана."""
+    month = _month_start(month)
+    name = partition_name(month)
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    end_month = _add_months(month, 1)
+    end = datetime(end_month.year, end_month.month, 1, tzinfo=dt_timezone.utc)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(
+            f'CREATE TABLE "{name}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+    return True
+
+
+def ensure_partitions(months_ahead: int = 3, start: Optional[date] = None) -> list[str]:
+    """Гарантирует партиции с месяца `start` (по умолчанию текущего) на months_ahead вперёд."""
+    _require_postgres()
+    if not is_partitioned():
+        raise PartitioningError(f"Таблица {TABLE} не партиционирована, сначала выполните --convert.")
+    first = _month_start(start or date.today())
+    created = []
+    with transaction.atomic():
+        for offset in range(months_ahead + 1):
+            month = _add_months(first, offset)
+            if create_month_partition(month):
+                created.append(partition_name(month))
+    return created
+
+
+def convert_to_partitioned(months_ahead: int = 3) -> list[str]:
+    """
+    Переносит существующую таблицу в партиционированную: создаёт новую таблицу,
+    партиции на весь диапазон данных + months_ahead, копирует строки и восстанавливает
+    индексы и внешние ключи исходной таблицы. Выполняется в одной транзакции.
+    """
+    _require_postgres()
+    if is_partitioned():
+        raise PartitioningError(f"Таблица {TABLE} уже партиционирована.")
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes
+            WHERE tablename = %s AND indexname NOT IN (
+                SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'
+            )
+            """,
+            [TABLE, TABLE],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) "
+            "AND contype = 'f'",
+            [TABLE],
+        )
+        fk_defs = cursor.fetchall()
+        cursor.execute(f'SELECT min(created_at), coalesce(max(id), 0) FROM "{TABLE}"')
+        min_created, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f'CREATE SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(%s)', [SEQUENCE])
+        cursor.execute("SELECT setval(%s, %s)", [SEQUENCE, max_id + 1])
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+        created = []
+        month = _month_start(min_created.date() if min_created else date.today())
+        last = _add_months(_month_start(date.today()), months_ahead)
+        while month <= last:
+            create_month_partition(month)
+            created.append(partition_name(month))
+            month = _add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY_TABLE}"')
+        cursor.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+        # Ключ и индексы — после удаления старой таблицы: их имена заняты её индексами
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, created_at)')
+        # Определения сняты до переименования и ссылаются на имя новой таблицы
+        for indexdef in index_defs:
+            cursor.execute(indexdef)
+        for conname, condef in fk_defs:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{conname}" {condef}')
+    return created
+
+
+def drop_empty_partitions(before: datetime) -> list[str]:
+    """Удаляет пустые (уже свёрнутые retention-командой) партиции, целиком лежащие до `before`."""
+    _require_postgres()
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for name, upper in list_partitions():
+            if upper is None or upper > before:
+                continue
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{name}")')
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(f'DROP TABLE "{name}"')
+            dropped.append(name)
+    return dropped
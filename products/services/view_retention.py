@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta
+from typing import Callable, Optional
+
+from django.db import transaction
+from django.contrib.auth.models import Group
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from products.models import ProductView, ProductViewDaily
+
+CM_GROUP = "Content Managers"
+ROLE_FIELDS = ["views", "anon_views", "cm_views", "admin_views"]
+
+
+@dataclass
+class RollupStats:
+    cutoff: datetime
+    batches: int = 0
+    raw_deleted: int = 0
+    daily_created: int = 0
+    daily_updated: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+def retention_cutoff(days: int) -> datetime:
+    """Начало локальных суток `days` дней назад: сворачиваем только целые дни."""
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def rollup_batch(cutoff: datetime, batch_size: int, stats: RollupStats) -> int:
+    """Сворачивает одну пачку сырых просмотров в суточные агрегаты и удаляет её. Возвращает размер пачки."""
+    with transaction.atomic():
+        ids = list(
+            ProductView.objects.filter(created_at__lt=cutoff)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        # Роль — подзапросом, а не join с группами: join размножил бы строки просмотров
+        is_cm = Exists(Group.objects.filter(name=CM_GROUP, user=OuterRef("user_id")))
+        grouped = (
+            ProductView.objects.filter(pk__in=ids)
+            .annotate(day=TruncDate("created_at"), is_cm=is_cm)
+            .values("product_id", "day")
+            .annotate(
+                views=Count("id"),
+                anon_views=Count("id", filter=Q(user__isnull=True)),
+                cm_views=Count("id", filter=Q(is_cm=True)),
+                admin_views=Count("id", filter=Q(user__is_superuser=True)),
+            )
+            .order_by()
+        )
+        counts = {(row["product_id"], row["day"]): [row[f] for f in ROLE_FIELDS] for row in grouped}
+        existing = {
+            (d.product_id, d.day): d
+            for d in ProductViewDaily.objects.select_for_update().filter(
+                product_id__in={key[0] for key in counts}, day__in={key[1] for key in counts}
+            )
+        }
+        to_create: list[ProductViewDaily] = []
+        to_update: list[ProductViewDaily] = []
+        for (product_id, day), values in counts.items():
+            daily = existing.get((product_id, day))
+            if daily is None:
+                to_create.append(ProductViewDaily(product_id=product_id, day=day, **dict(zip(ROLE_FIELDS, values))))
+            else:
+                for name, value in zip(ROLE_FIELDS, values):
+                    setattr(daily, name, getattr(daily, name) + value)
+                to_update.append(daily)
+        ProductViewDaily.objects.bulk_create(to_create)
+        ProductViewDaily.objects.bulk_update(to_update, ROLE_FIELDS)
+        deleted, _ = ProductView.objects.filter(pk__in=ids).delete()
+
+    stats.batches += 1
+    stats.raw_deleted += deleted
+    stats.daily_created += len(to_create)
+    stats.daily_updated += len(to_update)
+    return len(ids)
+
+
+def rollup_views(
+    days: int,
+    batch_size: int = 5000,
+    max_batches: Optional[int] = None,
+    progress: Optional[Callable[[RollupStats], None]] = None,
+) -> RollupStats:
+    stats = RollupStats(cutoff=retention_cutoff(days))
+    while max_batches is None or stats.batches < max_batches:
+        if not rollup_batch(stats.cutoff, batch_size, stats):
+            break
+        if progress:
+            progress(stats)
+    return stats
+
+
+def total_views() -> int:
+    """Все просмотры: сырые + уже свёрнутые в суточные агрегаты."""
+    archived = ProductViewDaily.objects.aggregate(s=Sum("views"))["s"] or 0
+    return ProductView.objects.count() + archived
+
+
+def views_by_role() -> dict[str, int]:
+    """Просмотры по ролям из одних источников (сырые + свёрнутые): anon, cms, admins, users — остальные."""
+    archived = ProductViewDaily.objects.aggregate(**{name: Sum(name) for name in ROLE_FIELDS})
+    raw = ProductView.objects.aggregate(
+        views=Count("id"),
+        anon_views=Count("id", filter=Q(user__isnull=True)),
+        cm_views=Count("id", filter=Q(Exists(Group.objects.filter(name=CM_GROUP, user=OuterRef("user_id"))))),
+        admin_views=Count("id", filter=Q(user__is_superuser=True)),
+    )
+    total = {name: raw[name] + (archived[name] or 0) for name in ROLE_FIELDS}
+    return dict(
+        anon=total["anon_views"],
+        cms=total["cm_views"],
+        admins=total["admin_views"],
+        users=total["views"] - total["anon_views"] - total["cm_views"] - total["admin_views"],
+    )
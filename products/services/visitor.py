@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase
+
+VISITOR_COOKIE_SALT = "products.visitor"
+
+
+def get_visitor_id(request: HttpRequest) -> Optional[str]:
+    """id посетителя из подписанной cookie (или выданный в этом запросе); None — cookie нет или подпись неверна."""
+    visitor_id: Optional[str] = getattr(request, "_visitor_id", None)
+    if visitor_id is None:
+        visitor_id = request.get_signed_cookie(settings.VISITOR_COOKIE_NAME, default=None, salt=VISITOR_COOKIE_SALT)
+        request._visitor_id = visitor_id  # type: ignore[attr-defined]
+    return visitor_id
+
+
+def ensure_visitor_id(request: HttpRequest) -> str:
+    """Выдаёт id новому посетителю; cookie ставит set_visitor_cookie на ответе. Сессия при этом не создаётся."""
+    visitor_id = get_visitor_id(request)
+    if visitor_id is None:
+        visitor_id = uuid.uuid4().hex
+        request._visitor_id = visitor_id  # type: ignore[attr-defined]
+        request._visitor_id_issued = True  # type: ignore[attr-defined]
+    return visitor_id
+
+
+def set_visitor_cookie(request: HttpRequest, response: HttpResponseBase) -> None:
+    visitor_id = get_visitor_id(request)
+    if visitor_id and getattr(request, "_visitor_id_issued", False):
+        response.set_signed_cookie(
+            settings.VISITOR_COOKIE_NAME, visitor_id, salt=VISITOR_COOKIE_SALT,
+            max_age=settings.VISITOR_COOKIE_AGE, httponly=True, samesite="Lax",
+            secure=settings.SESSION_COOKIE_SECURE,
+        )
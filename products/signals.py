@@ -0,0 +1,70 @@
+from __future__ import annotations
+from typing import Any, Type
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Category, Product, Review
+from .services.catalog_engine import TRACKED_FIELDS, catalog_engine
+from .services.facets import invalidate_category_tree
+from .services.suggest import INDEXED_FIELDS, suggest_service
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_product_rating(sender: Type[Review], instance: Review, **kwargs: Any) -> None:
+    # Экземпляр-заглушка: recalc_rating пишет через UPDATE и не требует загрузки товара
+    product = Product(pk=instance.product_id)
+    product.recalc_rating()
+    # Рейтинг и число отзывов — колонки снимка каталога: правим строку (после коммита), снимок не перестраиваем
+    product_id, rating_avg, reviews_count = product.pk, product.rating_avg, product.reviews_count
+    transaction.on_commit(lambda: catalog_engine.rating_changed(product_id, rating_avg, reviews_count), robust=True)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def reset_category_tree(sender: Type[Category], instance: Category, **kwargs: Any) -> None:
+    # До коммита параллельный запрос пересобрал бы дерево из старых данных и закэшировал его
+    transaction.on_commit(invalidate_category_tree, robust=True)
+
+
+@receiver(post_save, sender=Product)
+def update_suggest_product(sender: Type[Product], instance: Product, **kwargs: Any) -> None:
+    # Сохранения без изменений индексируемых полей (остаток, счётчики) индекс не трогают
+    if instance.changed_fields(INDEXED_FIELDS, kwargs.get("update_fields")):
+        # Запись — по данным на момент сохранения; индекс и версия — после коммита, как и в stock.py:
+        # иначе другие процессы перестроили бы индекс по ещё не закоммиченным (или откатившимся) данным
+        product_id, entry = instance.pk, suggest_service.product_entry(instance)
+        transaction.on_commit(lambda: suggest_service.product_changed(product_id, entry), robust=True)
+
+
+@receiver(post_delete, sender=Product)
+def remove_suggest_product(sender: Type[Product], instance: Product, **kwargs: Any) -> None:
+    product_id = instance.pk
+    transaction.on_commit(lambda: suggest_service.product_deleted(product_id), robust=True)
+
+
+@receiver(post_save, sender=Category)
+def update_suggest_category(sender: Type[Category], instance: Category, **kwargs: Any) -> None:
+    category_id, name, slug = instance.pk, instance.name, instance.slug
+    transaction.on_commit(lambda: suggest_service.category_changed(category_id, name, slug), robust=True)
+
+
+@receiver(post_delete, sender=Category)
+def remove_suggest_category(sender: Type[Category], instance: Category, **kwargs: Any) -> None:
+    category_id = instance.pk
+    transaction.on_commit(lambda: suggest_service.category_deleted(category_id), robust=True)
+
+
+@receiver(post_save, sender=Product)
+def update_catalog_engine(sender: Type[Product], instance: Product, **kwargs: Any) -> None:
+    if instance.changed_fields(TRACKED_FIELDS, kwargs.get("update_fields")):
+        # Чтение строки и версия — после коммита: иначе другие воркеры перестроят снимок без этой правки,
+        # а при откате она останется в нашем
+        product_id = instance.pk
+        transaction.on_commit(lambda: catalog_engine.product_changed(product_id), robust=True)
+
+
+@receiver(post_delete, sender=Product)
+def remove_catalog_engine_product(sender: Type[Product], instance: Product, **kwargs: Any) -> None:
+    product_id = instance.pk
+    transaction.on_commit(lambda: catalog_engine.product_deleted(product_id), robust=True)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+from typing import Any, Iterable
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import Model
+from django.template.base import FilterExpression, NodeList, Parser, Token
+
+register = template.Library()
+
+
+def fragment_versions(value: Any) -> list[str]:
+    """
+    Части ключа фрагмента: модель — «метка:pk:updated_at», коллекция — версии всех элементов,
+    остальное — str(). Изменение объекта меняет ключ, поэтому старые фрагменты не чистятся, а просто истекают.
+    """
+    if isinstance(value, Model):
+        updated_at = getattr(value, "updated_at", None)
+        return [f"{value._meta.label_lower}:{value.pk}:{updated_at.isoformat() if updated_at else ''}"]
+    if isinstance(value, (str, bytes)) or not isinstance(value, Iterable):
+        return [str(value)]
+    items = sorted(value) if isinstance(value, (set, frozenset)) else value
+    return [part for item in items for part in fragment_versions(item)]
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist: NodeList, name: FilterExpression, vary_on: list[FilterExpression]) -> None:
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context: template.Context) -> str:
+        parts = [part for var in self.vary_on for part in fragment_versions(var.resolve(context))]
+        key = make_template_fragment_key(str(self.name.resolve(context)), parts)
+        content: str | None = cache.get(key)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+        return content
+
+
+@register.tag
+def cachefragment(parser: Parser, token: Token) -> CacheFragmentNode:
+    """
+    {% cachefragment "product-card" product product.category %}...{% endcachefragment %}
+    Кэширует отрендеренный фрагмент по имени и версиям объектов; фрагменты можно вкладывать
+    (страница по набору товаров, внутри — карточка по товару). Внутри не должно быть
+    пользовательских данных и {% csrf_token %}: фрагмент общий для всех посетителей.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name")
+    nodelist = parser.parse(("endcachefragment",))
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(b) for b in bits[2:]])
@@ -3,7 +3,7 @@ from typing import List, Union
 from django.urls import path, include, URLPattern, URLResolver
 from rest_framework.routers import DefaultRouter
 from .views import (
-    ProductListView, ProductDetailView, add_review,
+    ProductListView, ProductDetailView, add_review, product_reviews,
     ProductViewSet, CategoryViewSet, CartApiViewSet,
     CategoryListView, CategoryDetailView,
 )
@@ -19,6 +19,7 @@ urlpatterns: List[Union[URLPattern, URLResolver]] = [
     path("category/<slug:slug>/", CategoryDetailView.as_view(), name="category_detail"),
     path("product/<slug:slug>/", ProductDetailView.as_view(), name="product_detail"),
     path("product/<slug:slug>/review/", add_review, name="add_review"),
+    path("product/<slug:slug>/reviews/", product_reviews, name="product_reviews"),
 ]
 
 # API
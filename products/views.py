@@ -3,9 +3,9 @@ from typing import Any, Optional, cast
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Q, Count, QuerySet, F
+from django.db.models import Q, QuerySet, F
 from django.http import HttpRequest, HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.generic import ListView, DetailView
 
@@ -18,24 +18,37 @@ from rest_framework import status
 from .models import Product, Category, Review, ProductView
 from .filters import ProductFilter
 from .forms import ReviewForm
+from .paginators import ReviewCursorPagination
 from .serializers import (
     ProductSerializer, CategorySerializer, ReviewSerializer, ProductCreateReviewSerializer
 )
+from .services.catalog_engine import EngineResult, build_query, catalog_engine
+from .services.facets import compute_facets, descendant_ids
+from .services.recommendations import related_products
+from .services.reviews import review_page
+from .services.suggest import suggest_service
+from .services.view_dedup import client_ip, get_deduplicator, is_bot
+from .services.visitor import ensure_visitor_id, get_visitor_id, set_visitor_cookie
+from orders.serializers import CartBulkSerializer
 from orders.services.cart import Cart
+from orders.services.purchases import has_purchased, purchased_product_ids
 
 
 # Хэлпер для потомков категории
 def get_descendant_ids(root: Category) -> list[int]:
-    ids: list[int] = [root.id]
-    level: list[int] = [root.id]
-    while level:
-        children_qs = Category.objects.filter(parent_id__in=level).values_list("id", flat=True)
-        children: list[int] = list(children_qs)
-        if not children:
-            break
-        ids.extend(children)
-        level = children
-    return ids
+    return descendant_ids(root.id)
+
+
+def order_products(qs: QuerySet[Product], ordering: Optional[str]) -> QuerySet[Product]:
+    if ordering == "price":
+        return qs.order_by("price")
+    if ordering == "-price":
+        return qs.order_by("-price")
+    if ordering == "new":
+        return qs.order_by("-created_at")
+    if ordering == "popular":
+        return qs.order_by("-reviews_count")
+    return qs
 
 
 # Въюхи
@@ -44,36 +57,48 @@ class ProductListView(ListView):
     model = Product
     context_object_name = "products"
     paginate_by = 12
+    facets_enabled = True
+    # Отдавать список из колоночного снимка (CATALOG_ENGINE), если запрос ему по силам
+    use_catalog_engine = True
 
-    def get_queryset(self) -> QuerySet[Product]:
+    def get_base_queryset(self) -> QuerySet[Product]:
         qs: QuerySet[Product] = Product.objects.select_related("category").filter(is_active=True)
         q = self.request.GET.get("q")
         if q:
             qs = qs.filter(Q(name__icontains=q) | Q(description__icontains=q))
-        f = ProductFilter(self.request.GET, queryset=qs)
-        qs = f.qs
-        ordering = self.request.GET.get("ordering")
-        if ordering == "price":
-            qs = qs.order_by("price")
-        elif ordering == "-price":
-            qs = qs.order_by("-price")
-        elif ordering == "new":
-            qs = qs.order_by("-created_at")
-        elif ordering == "popular":
-            qs = qs.annotate(cnt=Count("reviews")).order_by("-cnt")
         return qs
 
+    def get_filtered_queryset(self) -> QuerySet[Product]:
+        return ProductFilter(self.request.GET, queryset=self.get_base_queryset()).qs
+
+    def get_engine_category_ids(self) -> Optional[list[int]]:
+        """Ограничение базового queryset по категориям — для запроса к снимку."""
+        return None
+
+    def get_queryset(self) -> QuerySet[Product] | EngineResult:  # type: ignore[override]
+        # Нужен и в режиме снимка: фасеты считаются по нему в SQL
+        self.filtered_queryset = self.get_filtered_queryset()
+        if self.use_catalog_engine and catalog_engine.available:
+            query = build_query(self.request.GET, self.get_engine_category_ids())
+            if query is not None:
+                return catalog_engine.search(query)
+        return order_products(self.filtered_queryset, self.request.GET.get("ordering"))
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         ctx = super().get_context_data(**kwargs)
         ctx["categories"] = Category.objects.all().order_by("name")
         selected = self.request.GET.get("category")
         ctx["selected_category_id"] = int(selected) if selected and selected.isdigit() else None
         ctx["current_category"] = None
+        if self.facets_enabled:
+            ctx["facets"] = compute_facets(self.filtered_queryset)
+        ctx["purchased_ids"] = purchased_product_ids(self.request.user, [p.pk for p in ctx["object_list"]])
         return ctx
 
 
 class HomeView(ProductListView):
     template_name = "home.html"
+    facets_enabled = False
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         ctx = super().get_context_data(**kwargs)
@@ -98,22 +123,13 @@ class CategoryListView(ListView):
 
 
 class CategoryDetailView(ProductListView):
-    def get_queryset(self) -> QuerySet[Product]:
+    def get_base_queryset(self) -> QuerySet[Product]:
         self.category = get_object_or_404(Category, slug=self.kwargs["slug"])
         ids = get_descendant_ids(self.category)
-        base: QuerySet[Product] = Product.objects.select_related("category").filter(is_active=True, category_id__in=ids)
-        f = ProductFilter(self.request.GET, queryset=base)
-        qs = f.qs
-        ordering = self.request.GET.get("ordering")
-        if ordering == "price":
-            qs = qs.order_by("price")
-        elif ordering == "-price":
-            qs = qs.order_by("-price")
-        elif ordering == "new":
-            qs = qs.order_by("-created_at")
-        elif ordering == "popular":
-            qs = qs.annotate(cnt=Count("reviews")).order_by("-cnt")
-        return qs
+        return super().get_base_queryset().filter(category_id__in=ids)
+
+    def get_engine_category_ids(self) -> Optional[list[int]]:
+        return get_descendant_ids(self.category)
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         ctx = super().get_context_data(**kwargs)
@@ -134,23 +150,38 @@ class ProductDetailView(DetailView):
         self.object = self.get_object()
         self._record_view(request, self.object)
         context = self.get_context_data(object=self.object)
-        return self.render_to_response(context)
+        response = self.render_to_response(context)
+        set_visitor_cookie(request, response)
+        return response
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         ctx = super().get_context_data(**kwargs)
-        ctx["reviews"] = self.object.reviews.select_related("user")
+        # Только первая страница отзывов; остальные догружаются через product_reviews
+        ctx["reviews_page"] = review_page(self.object)
+        ctx["related_products"] = related_products(self.object)
+        ctx["has_purchased"] = has_purchased(self.request.user, self.object.pk)
         ctx["form"] = ReviewForm()
         ctx["back_url"] = self.request.META.get("HTTP_REFERER") or reverse("products:product_list")
         return ctx
 
     def _record_view(self, request: HttpRequest, product: Product) -> None:
-        if not request.session.session_key:
-            request.session.save()
-        session_key = request.session.session_key or ""
-        ip = request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")[0].strip() or request.META.get("REMOTE_ADDR")
+        # Посетителя узнаём по подписанной cookie, а не по сессии: просмотр каталога не пишет
+        # в хранилище сессий. Ботам id не выдаём; повторы и боты отсекаются до записи в БД
+        if not is_bot(request):
+            ensure_visitor_id(request)
+        if not get_deduplicator().should_record(request, product.pk):
+            return
+        ip = client_ip(request) or None
         user = request.user if request.user.is_authenticated else None
         Product.objects.filter(pk=product.pk).update(view_count=F("view_count") + 1)
-        ProductView.objects.create(product=product, user=user, session_key=session_key, ip=ip)
+        ProductView.objects.create(product=product, user=user, visitor_id=get_visitor_id(request) or "", ip=ip)
+
+
+def product_reviews(request: HttpRequest, slug: str) -> HttpResponse:
+    """Следующая страница отзывов фрагментом HTML для кнопки «Показать ещё»."""
+    product = get_object_or_404(Product, slug=slug, is_active=True)
+    page = review_page(product, request.GET.get("after"))
+    return render(request, "products/reviews_page.html", {"product": product, "reviews_page": page})
 
 
 @login_required
@@ -158,10 +189,8 @@ def add_review(request: HttpRequest, slug: str) -> HttpResponse:
     product = get_object_or_404(Product, slug=slug, is_active=True)
     form = ReviewForm(request.POST)
     if form.is_valid():
-        from orders.models import Order
         user = cast(User, request.user)
-        has_bought = Order.objects.filter(user=user, items__product=product).exclude(status="cancelled").exists()
-        if not has_bought:
+        if not has_purchased(user, product.pk):
             messages.error(request, "Оставлять отзыв можно только после покупки.")
             return redirect(product.get_absolute_url())
         Review.objects.update_or_create(
@@ -189,13 +218,35 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ["name", "description"]
     ordering_fields = ["price", "created_at"]
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "catalog"
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request: Request) -> Response:
+        qs = self.filter_queryset(self.get_queryset())
+        return Response(compute_facets(qs))
+
+    @action(detail=False, methods=["get"])
+    def suggest(self, request: Request) -> Response:
+        """Подсказки по префиксам слов из индекса в памяти, без запросов к БД."""
+        query = request.query_params.get("q", "").strip()
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 20)
+        except ValueError:
+            limit = 10
+        return Response(suggest_service.suggest(query[:100], limit))
+
+    @action(detail=True, methods=["get"])
+    def related(self, request: Request, pk: Optional[str] = None) -> Response:
+        product = self.get_object()
+        return Response(ProductSerializer(related_products(product), many=True).data)
 
     @action(detail=True, methods=["get", "post"], permission_classes=[permissions.IsAuthenticated])
     def reviews(self, request: Request, pk: Optional[str] = None) -> Response:
         product = self.get_object()
         if request.method == "GET":
-            qs = product.reviews.select_related("user").all()
-            return Response(ReviewSerializer(qs, many=True).data)
+            paginator = ReviewCursorPagination()
+            page = paginator.paginate_queryset(product.reviews.select_related("user"), request, view=self)
+            return paginator.get_paginated_response(ReviewSerializer(page, many=True).data)
         serializer = ProductCreateReviewSerializer(
             data=request.data, context={"request": request, "product": product}
         )
@@ -206,6 +257,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 
 class CartApiViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "cart"
 
     def list(self, request: Request) -> Response:
         cart = Cart(request)
@@ -232,6 +284,17 @@ class CartApiViewSet(viewsets.ViewSet):
         Cart(request).add(product=product, quantity=quantity, override=False)
         return Response(Cart(request).to_dict(), status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request: Request) -> Response:
+        """Пакетное изменение корзины: всё или ничего, с результатом по каждой строке."""
+        serializer = CartBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = Cart(request)
+        ok, results = cart.apply(serializer.validated_data["operations"])
+        if not ok:
+            return Response({"results": results}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results, "cart": cart.to_dict()})
+
     def partial_update(self, request: Request, pk: Optional[str] = None) -> Response:
         product = get_object_or_404(Product, pk=pk)
         qty = int(request.data.get("quantity", 1))
@@ -7,5 +7,5 @@ class UsersConfig(AppConfig):
     verbose_name = "Пользователи"
 
     def ready(self) -> None:
-        from . import signals  # noqa: F401
+        from . import schema, signals  # noqa: F401
         return None
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property
+from typing import Any, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+# Токены пользователя, выпущенные не позже этой отметки (unix-время), отклоняются
+REVOKED_PREFIX = "auth:revoked_before:"
+
+
+def set_user_claims(token: Token, user: Any) -> None:
+    """Всё, что API нужно о пользователе без запроса к БД."""
+    token["username"] = user.get_username()
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    token["groups"] = sorted(g.name for g in user.groups.all())
+
+
+def revoke_user_tokens(user_id: Any) -> None:
+    """
+    Отзывает выданные пользователю access-токены: следующий запрос с ними вернёт 401,
+    клиент обновит токен и получит актуальные claims (или отказ, если пользователь деактивирован).
+    Отметка живёт не дольше самого access-токена.
+    """
+    lifetime = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set(f"{REVOKED_PREFIX}{user_id}", int(time.time()), lifetime + 60)
+    user_cache.discard(user_id)
+
+
+def revoked_before(user_id: Any) -> Optional[int]:
+    return cache.get(f"{REVOKED_PREFIX}{user_id}")
+
+
+class ShopTokenUser(TokenUser):
+    """Пользователь из claims токена: целочисленный id, группы и флаги персонала."""
+
+    @cached_property
+    def id(self) -> int:  # type: ignore[override]
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self) -> int:  # type: ignore[override]
+        return self.id
+
+    @cached_property
+    def group_names(self) -> frozenset[str]:
+        return frozenset(self.token.get("groups", ()))
+
+    def in_group(self, name: str) -> bool:
+        return name in self.group_names
+
+    def get_model(self) -> Any:
+        """Модель пользователя для кода, которому мало claims (email и т.п.)."""
+        return user_cache.get(self.id)
+
+
+class TokenUserAuthentication(JWTStatelessUserAuthentication):
+    """JWT без загрузки User из БД; проверяется только отметка отзыва в кэше."""
+
+    def get_validated_token(self, raw_token: bytes) -> Token:
+        token = super().get_validated_token(raw_token)
+        marker = revoked_before(token.get(api_settings.USER_ID_CLAIM))
+        if marker is not None and token.get("iat", 0) <= marker:
+            raise InvalidToken("Токен отозван, обновите его.")
+        return token
+
+
+class UserCache:
+    """
+    Небольшой LRU пользователей в памяти процесса. Запись считается устаревшей,
+    если после её загрузки пользователю отозвали токены (отметка общая через кэш).
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Any) -> Any:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None:
+                self._data.move_to_end(user_id)
+        if entry is not None:
+            loaded_at, user = entry
+            marker = revoked_before(user_id)
+            if marker is None or loaded_at > marker:
+                return user
+        user = get_user_model()._default_manager.select_related("profile").get(pk=user_id)
+        with self._lock:
+            self._data[user_id] = (time.time(), user)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return user
+
+    def discard(self, user_id: Any) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+user_cache = UserCache(getattr(settings, "JWT_USER_CACHE_SIZE", 1024))
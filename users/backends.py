@@ -0,0 +1,16 @@
+from __future__ import annotations
+from typing import Any, Optional
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileModelBackend(ModelBackend):
+    """ModelBackend, который загружает пользователя из сессии сразу с профилем (один запрос вместо двух)."""
+
+    def get_user(self, user_id: Any) -> Optional[Any]:
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related("profile").get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,8 @@
+from __future__ import annotations
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class TokenUserJWTScheme(SimpleJWTScheme):
+    """Описание TokenUserAuthentication в OpenAPI — та же bearer-схема JWT."""
+
+    target_class = "users.authentication.TokenUserAuthentication"
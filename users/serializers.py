@@ -1,6 +1,12 @@
 from __future__ import annotations
+from typing import Any
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+from .authentication import set_user_claims
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -17,3 +23,26 @@ class UserRegisterSerializer(serializers.ModelSerializer):
             password=validated_data["password"],
         )
         return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user: Any) -> Token:
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Новый access-токен получает актуальные claims, а не копию из refresh-токена."""
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, str]:
+        data = super().validate(attrs)
+        refresh = RefreshToken(attrs["refresh"])
+        user = get_user_model().objects.prefetch_related("groups").get(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        )
+        access = refresh.access_token
+        set_user_claims(access, user)
+        data["access"] = str(access)
+        return data
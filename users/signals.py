@@ -1,8 +1,9 @@
 from __future__ import annotations
-from typing import Any, Type
+from typing import Any, Optional, Type
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
+from .authentication import revoke_user_tokens
 from .models import Profile
 
 
@@ -10,3 +11,27 @@ from .models import Profile
 def create_or_update_profile(sender: Type[User], instance: User, created: bool, **kwargs: Any) -> None:
     if created:
         Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_change(sender: Type[User], instance: User, created: bool,
+                            update_fields: Optional[frozenset[str]] = None, **kwargs: Any) -> None:
+    # Вход обновляет только last_login — claims от этого не меняются
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def revoke_tokens_on_groups(sender: Any, instance: Any, action: str, reverse: bool,
+                            pk_set: Optional[set[Any]], **kwargs: Any) -> None:
+    # clear() ловим до очистки, пока состав группы ещё известен
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        revoke_user_tokens(instance.pk)
+        return
+    # Изменили состав группы: instance — группа, pk_set — пользователи
+    user_ids = pk_set if pk_set is not None else list(instance.user_set.values_list("pk", flat=True))
+    for user_id in user_ids:
+        revoke_user_tokens(user_id)
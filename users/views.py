@@ -14,6 +14,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .forms import RegisterForm, UserUpdateForm, ProfileForm
 from .serializers import UserRegisterSerializer
 from .models import Profile
+from orders.services.history import order_history_page, order_summary
 
 
 # Web
@@ -38,7 +39,11 @@ def register(request: HttpRequest) -> HttpResponse:
 @login_required
 def account(request: HttpRequest) -> HttpResponse:
     user: User = cast(User, request.user)
-    profile, _ = Profile.objects.get_or_create(user=user)
+    # Профиль уже подгружен бэкендом аутентификации; создаём только для старых пользователей без него
+    try:
+        profile = user.profile
+    except Profile.DoesNotExist:
+        profile = Profile.objects.create(user=user)
 
     if request.method == "POST":
         if "save_profile" in request.POST:
@@ -68,11 +73,14 @@ def account(request: HttpRequest) -> HttpResponse:
         pform = ProfileForm(instance=profile)
         pwd_form = PasswordChangeForm(user=user)
 
-    orders = user.orders.select_related().all()
     return render(
         request,
         "account/profile.html",
-        {"orders": orders, "uform": uform, "pform": pform, "pwd_form": pwd_form},
+        {
+            "orders_page": order_history_page(user.pk, request.GET.get("page")),
+            "order_summary": order_summary(user.pk),
+            "uform": uform, "pform": pform, "pwd_form": pwd_form,
+        },
     )
 
 